@@ -1,38 +1,62 @@
 from django.contrib import admin
-from .models import DiaryEntry, UserProfile, ReadEntry
+from django.db.models import Count
+from .models import DiaryEntry, Technology, TechnologyUsage, UserProfile, ReadMarker, UnreadEntry
+from .search import filter_by_search
 
 # Register your models here.
 @admin.register(DiaryEntry)
 class DiaryEntryAdmin(admin.ModelAdmin):
     list_display = ('user', 'date', 'title', 'technologies', 'created_at')
-    list_filter = ('user', 'date', 'technologies')
+    list_filter = ('user', 'date', 'tags')
     search_fields = ('title', 'content', 'technologies')
     date_hierarchy = 'date'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Search through the full-text index instead of icontains scans over search_fields."""
+        if not search_term.strip():
+            return queryset, False
+        return filter_by_search(queryset, search_term), False
+
+@admin.register(Technology)
+class TechnologyAdmin(admin.ModelAdmin):
+    list_display = ('name', 'key')
+    ordering = ('key',)
+    search_fields = ('key',)
+    readonly_fields = ('key',)
+
+@admin.register(TechnologyUsage)
+class TechnologyUsageAdmin(admin.ModelAdmin):
+    list_display = ('user', 'period', 'period_start', 'technology', 'entry_count')
+    list_filter = ('period',)
+    search_fields = ('user__username', 'technology__key')
+    list_select_related = ('user', 'technology')
+
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
-    list_display = ('user', 'get_following_count', 'get_followers_count')
+    list_display = ('user', 'entry_count', 'following_count', 'follower_count')
     search_fields = ('user__username',)
+    readonly_fields = ('entry_count', 'following_count', 'follower_count')
 
-    def get_following_count(self, obj):
-        return obj.following.count()
-    get_following_count.short_description = 'Following'
+@admin.register(ReadMarker)
+class ReadMarkerAdmin(admin.ModelAdmin):
+    list_display = ('reader', 'author', 'read_up_to', 'exception_count')
+    list_filter = ('read_up_to',)
+    search_fields = ('reader__username', 'author__username')
+    raw_id_fields = ('reader', 'author', 'exceptions')
+    date_hierarchy = 'read_up_to'
+    list_select_related = ('reader', 'author')
 
-    def get_followers_count(self, obj):
-        return obj.get_followers().count()
-    get_followers_count.short_description = 'Followers'
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(exception_count=Count('exceptions'))
 
-@admin.register(ReadEntry)
-class ReadEntryAdmin(admin.ModelAdmin):
-    list_display = ('user', 'entry_title', 'entry_author', 'read_at')
-    list_filter = ('user', 'read_at')
-    search_fields = ('user__username', 'entry__title')
-    date_hierarchy = 'read_at'
+    def exception_count(self, obj):
+        return obj.exception_count
+    exception_count.short_description = 'Read Past the Mark'
 
-    def entry_title(self, obj):
-        return obj.entry.title
-    entry_title.short_description = 'Entry Title'
 
-    def entry_author(self, obj):
-        return obj.entry.user.username
-    entry_author.short_description = 'Entry Author'
+@admin.register(UnreadEntry)
+class UnreadEntryAdmin(admin.ModelAdmin):
+    list_display = ('user', 'entry', 'author', 'created_at')
+    list_filter = ('created_at',)
+    search_fields = ('user__username', 'author__username', 'entry__title')
+    raw_id_fields = ('user', 'entry', 'author')
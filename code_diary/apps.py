@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class CodeDiaryConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "code_diary"
+
+    def ready(self):
+        from . import database  # noqa: F401, applies the SQLite pragmas to new connections
+        from .search import repair_search_index
+        post_migrate.connect(repair_search_index, sender=self)
@@ -0,0 +1,137 @@
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+DEFAULT_BROKER = 'code_diary.broker.InProcessBroker'
+
+
+class Subscription:
+    """Queue of the messages published to a channel for a single subscriber.
+
+    Use it as a context manager so the subscriber is removed from the broker when done.
+    """
+
+    def __init__(self, broker, channel, max_pending=100):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=max_pending)
+
+    def put(self, message):
+        """Queue a message for this subscriber. Safe to call from any thread."""
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            # The subscriber's event loop has already been closed
+            pass
+
+    def _put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Slow consumers only need to know that something new happened
+            pass
+
+    async def get(self):
+        """Wait for the next message."""
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class BaseBroker:
+    """Interface of the pub/sub backends used to push notifications to connected clients."""
+
+    def publish(self, channel, message):
+        """Deliver a message to every subscriber of a channel. Must be safe to call from any thread."""
+        raise NotImplementedError
+
+    def subscribe(self, channel):
+        """Register a subscriber on a channel and return its Subscription.
+
+        Must be called from the event loop the subscriber is consuming messages on.
+        """
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription):
+        """Stop delivering messages to a subscription."""
+        raise NotImplementedError
+
+
+class InProcessBroker(BaseBroker):
+    """Broker delivering messages to subscribers running in the same process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.put(message)
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel)
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+
+_broker = None
+
+
+def get_broker():
+    """Return the broker configured by CODE_DIARY_NOTIFICATION_BROKER."""
+    global _broker
+    if _broker is None:
+        _broker = import_string(getattr(settings, 'CODE_DIARY_NOTIFICATION_BROKER', DEFAULT_BROKER))()
+    return _broker
+
+
+@receiver(setting_changed)
+def reset_broker(setting, **kwargs):
+    """Drop the cached broker when the backend setting is overridden, e.g. in tests."""
+    global _broker
+    if setting == 'CODE_DIARY_NOTIFICATION_BROKER':
+        _broker = None
+
+
+def user_channel(user_id):
+    """Name of the channel carrying the notifications of a user."""
+    return f'user:{user_id}'
+
+
+def publish_new_entry(entry):
+    """Notify everyone following the author of an entry that it was posted."""
+    from .models import get_follower_ids
+
+    broker = get_broker()
+    message = {
+        'new_entries': True,
+        'entry_id': entry.pk,
+        'title': entry.title,
+        'author': entry.user.username,
+    }
+    for follower_id in get_follower_ids(entry.user_id):
+        broker.publish(user_channel(follower_id), message)
@@ -0,0 +1,111 @@
+import hashlib
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .routers import primary_reads
+
+ENTRIES_VERSION_KEY = 'code_diary:entries_version'
+USER_VERSION_KEY = 'code_diary:user_version:{}'
+DEFAULT_USER_CACHE_TIMEOUT = 3600
+
+_missing = object()
+
+
+def get_home_cache_timeout():
+    """Seconds a rendered home page entry list is kept in the cache."""
+    return getattr(settings, 'CODE_DIARY_HOME_CACHE_TIMEOUT', 3600)
+
+
+def get_entries_version():
+    """Return the global version of the diary entries, bumped whenever any entry changes."""
+    version = cache.get(ENTRIES_VERSION_KEY)
+    if version is None:
+        # Start from the clock so an evicted version never reuses old fragment keys
+        cache.add(ENTRIES_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(ENTRIES_VERSION_KEY, time.time_ns())
+    return version
+
+
+def bump_entries_version():
+    """Invalidate everything cached under the current entries version."""
+    try:
+        cache.incr(ENTRIES_VERSION_KEY)
+    except ValueError:
+        cache.set(ENTRIES_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def get_user_cache_timeout():
+    """Seconds the cached pages and fragments of a user are kept in the cache."""
+    return getattr(settings, 'CODE_DIARY_USER_CACHE_TIMEOUT', DEFAULT_USER_CACHE_TIMEOUT)
+
+
+def get_user_versions(user_ids):
+    """Return the versions of users, bumped whenever their entries or follows change, by user id."""
+    keys = {USER_VERSION_KEY.format(user_id): user_id for user_id in user_ids}
+    versions = cache.get_many(keys)
+    for key in keys.keys() - versions.keys():
+        # Start from the clock so an evicted version never reuses old keys
+        cache.add(key, time.time_ns(), timeout=None)
+        versions[key] = cache.get(key, time.time_ns())
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def get_user_version(user_id):
+    return get_user_versions([user_id])[user_id]
+
+
+def bump_user_versions(user_ids):
+    """Invalidate everything cached under the current versions of these users."""
+    for user_id in set(user_ids):
+        key = USER_VERSION_KEY.format(user_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+class CacheStats:
+    """Hit and miss counters of the values cached with cached(), by name, for this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = defaultdict(lambda: {'hits': 0, 'misses': 0})
+
+    def record(self, name, hit):
+        with self._lock:
+            self._counts[name]['hits' if hit else 'misses'] += 1
+
+    def snapshot(self):
+        """Return the counters of each name, with the ratio of lookups that were hits."""
+        with self._lock:
+            return {
+                name: {**counts, 'hit_ratio': round(counts['hits'] / (counts['hits'] + counts['misses']), 3)}
+                for name, counts in sorted(self._counts.items())
+            }
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+cache_stats = CacheStats()
+
+
+def cached(name, key_parts, compute, timeout):
+    """Return the value cached under `name` for `key_parts`, computing and caching it on a miss.
+
+    Key parts should include the versions the value depends on, so bumping them invalidates it. The
+    value is computed from the primary database, since it is shared until the next bump.
+    """
+    key = f"code_diary:{name}:{hashlib.sha1(repr(key_parts).encode()).hexdigest()}"
+    value = cache.get(key, _missing)
+    cache_stats.record(name, value is not _missing)
+    if value is _missing:
+        with primary_reads():
+            value = compute()
+        cache.set(key, value, timeout)
+    return value
@@ -0,0 +1,77 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib import messages
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+DEFAULT_PUBLIC_CACHE_MAX_AGE = 0
+
+
+def get_public_cache_max_age():
+    """Return the seconds browsers and proxies may reuse an anonymous page without revalidating it."""
+    return getattr(settings, 'CODE_DIARY_PUBLIC_CACHE_MAX_AGE', DEFAULT_PUBLIC_CACHE_MAX_AGE)
+
+
+def make_etag(*parts):
+    """Build a strong ETag from the values a page is rendered from."""
+    return quote_etag(hashlib.sha1(repr(parts).encode()).hexdigest())
+
+
+class ConditionalGetMixin:
+    """View mixin answering GET requests with 304 Not Modified when the page has not changed.
+
+    Views implement get_page_state(), returning the values the page is rendered from and the time
+    it was last modified, much more cheaply than building the page: a 304 skips the view's get(),
+    so the objects are neither fetched nor rendered. For logged-in users the ETag also covers what
+    the page shows about them, and Last-Modified is left out since it cannot.
+    """
+
+    def get_page_state(self):
+        """Return a (values, last modified datetime or None) pair, or None to always render the page."""
+        raise NotImplementedError
+
+    def get_viewer_state(self):
+        """Return the values the page shows about the current user, or None if it cannot be validated."""
+        request = self.request
+        if len(messages.get_messages(request)):
+            # Flash messages are shown once, so the page must be rendered
+            return None
+        user = request.user
+        if not user.is_authenticated:
+            return ()
+        return (
+            user.pk, user.username, user.is_staff,
+            # Forms on the page carry a token derived from the CSRF secret
+            request.COOKIES.get(settings.CSRF_COOKIE_NAME),
+            request.social_graph.has_unread,
+        )
+
+    def get(self, request, *args, **kwargs):
+        viewer_state = self.get_viewer_state()
+        page_state = self.get_page_state() if viewer_state is not None else None
+        if page_state is None:
+            response = super().get(request, *args, **kwargs)
+        else:
+            values, last_modified = page_state
+            etag = make_etag(*viewer_state, *values)
+            if last_modified is not None and not request.user.is_authenticated:
+                last_modified = int(last_modified.timestamp())
+            else:
+                last_modified = None
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = super().get(request, *args, **kwargs)
+            response.headers.setdefault('ETag', etag)
+            if last_modified is not None:
+                response.headers.setdefault('Last-Modified', http_date(last_modified))
+        self.patch_cache_headers(response)
+        return response
+
+    def patch_cache_headers(self, response):
+        """Let shared caches store anonymous pages, and only the browser the pages of logged-in users."""
+        patch_vary_headers(response, ('Cookie',))
+        if self.request.user.is_authenticated or response.cookies:
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(response, public=True, max_age=get_public_cache_max_age(), must_revalidate=True)
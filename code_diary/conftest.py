@@ -0,0 +1,41 @@
+import pytest
+from django.conf import settings as django_settings
+from django.core.cache import cache
+
+from .caching import cache_stats
+from .receipts import get_read_receipts
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Start every test with an empty cache and counters so cached fragments never leak between tests."""
+    cache.clear()
+    cache_stats.reset()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def read_receipts(settings):
+    """Flush buffered read receipts only when a test asks for it, never from a timer thread."""
+    settings.CODE_DIARY_READ_RECEIPT_FLUSH_INTERVAL = None
+    yield get_read_receipts()
+
+
+@pytest.fixture(scope='session')
+def django_db_modify_db_settings(django_db_modify_db_settings_parallel_suffix, tmp_path_factory):
+    """Add a second SQLite file standing in for a read replica, as the `replica` alias.
+
+    Nothing copies rows to it, so tests routing reads to it with CODE_DIARY_DATABASE_REPLICAS see where
+    each read went. Only tests listing it in `databases` create it.
+    """
+    default = django_settings.DATABASES['default']
+    django_settings.DATABASES['replica'] = {
+        **default,
+        'TEST': {
+            **default['TEST'],
+            'NAME': str(tmp_path_factory.mktemp('replica') / 'replica.sqlite3'),
+            # Created from the models like a copy of the schema, since replicas are never migrated
+            'MIGRATE': False,
+        },
+    }
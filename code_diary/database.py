@@ -0,0 +1,47 @@
+import re
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# Pragmas applied to new SQLite connections when CODE_DIARY_SQLITE_PRAGMAS is not set
+DEFAULT_SQLITE_PRAGMAS = {
+    # Readers no longer block the writer, nor the writer readers
+    'journal_mode': 'WAL',
+    # Safe with WAL: a power loss can only lose the last transactions, never corrupt the database
+    'synchronous': 'NORMAL',
+    # Milliseconds a connection waits for the write lock before raising "database is locked"
+    'busy_timeout': 5000,
+    'mmap_size': 128 * 1024 * 1024,
+    # Negative sizes are in KiB
+    'cache_size': -20000,
+}
+
+PRAGMA_NAME_RE = re.compile(r'^[a-z_]+$')
+PRAGMA_VALUE_RE = re.compile(r'^(-?\d+|[A-Za-z]+)$')
+
+
+def get_sqlite_pragmas():
+    """Return the pragmas applied to new SQLite connections, skipping those set to None."""
+    pragmas = getattr(settings, 'CODE_DIARY_SQLITE_PRAGMAS', DEFAULT_SQLITE_PRAGMAS)
+    return {name: value for name, value in pragmas.items() if value is not None}
+
+
+def get_pragma_statements(pragmas):
+    """Return the PRAGMA statements setting `pragmas`, refusing names or values that are not plain words or numbers."""
+    statements = []
+    for name, value in pragmas.items():
+        if not PRAGMA_NAME_RE.match(name) or not PRAGMA_VALUE_RE.match(str(value)):
+            raise ValueError(f"Invalid SQLite pragma {name}={value!r}")
+        statements.append(f'PRAGMA {name} = {value}')
+    return statements
+
+
+@receiver(connection_created)
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """Apply the CODE_DIARY_SQLITE_PRAGMAS settings to each new SQLite connection."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for statement in get_pragma_statements(get_sqlite_pragmas()):
+            cursor.execute(statement)
@@ -0,0 +1,71 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import DiaryEntry
+
+# Fields written for each entry, in the order import_entries reads them back
+EXPORT_FIELDS = ('date', 'title', 'content', 'technologies')
+# Format name: (content type, file extension)
+EXPORT_FORMATS = {
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+    'csv': ('text/csv', 'csv'),
+    'markdown': ('text/markdown', 'md'),
+}
+EXPORT_CHUNK_SIZE = 500
+
+
+def get_export_queryset(user, since=None):
+    """Return a user's entries in export order, oldest first, optionally from the date `since` on.
+
+    Exports are resumed by passing the date of the last entry received as `since`; entries of
+    that date are sent again, so a partial last day is never lost.
+    """
+    entries = DiaryEntry.objects.filter(user=user)
+    if since is not None:
+        entries = entries.filter(date__gte=since)
+    return entries.order_by('date', 'id').values_list(*EXPORT_FIELDS)
+
+
+class Echo:
+    """File-like object handing back what csv.writer writes, so rows can be yielded one by one."""
+
+    def write(self, value):
+        return value
+
+
+def iter_jsonl(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(EXPORT_FIELDS, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def iter_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_markdown(rows, title="Code Diary"):
+    yield f"# {title}\n"
+    for day, entry_title, content, technologies in rows:
+        yield f"\n---\n\n## {day:%Y-%m-%d}: {entry_title}\n\n"
+        if technologies:
+            yield f"*Technologies:* {technologies}\n\n"
+        yield f"{content.rstrip()}\n"
+
+
+def iter_export(user, export_format, since=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield a user's entries serialized as `export_format`, reading them from the database in chunks.
+
+    Only one chunk of entries is held in memory at a time however long the diary is.
+    """
+    rows = get_export_queryset(user, since).iterator(chunk_size=chunk_size)
+    if export_format == 'jsonl':
+        return iter_jsonl(rows)
+    if export_format == 'csv':
+        return iter_csv(rows)
+    if export_format == 'markdown':
+        return iter_markdown(rows, title=f"{user.username}'s Code Diary")
+    raise ValueError(f"Unknown export format: {export_format!r}")
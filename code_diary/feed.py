@@ -0,0 +1,47 @@
+from .models import DiaryEntry, InboxItem, UserProfile
+from .pagination import decode_cursor, encode_cursor, keyset_filter, parse_cursor_values
+
+FEED_ORDERING = ('-created_at', '-id')
+INBOX_ORDERING = ('-created_at', '-entry_id')
+
+
+def get_feed_page(user, cursor=None, per_page=10):
+    """Return a page of entries from the users `user` follows and the cursor of the next page.
+
+    Entries are read from the user's inbox, which is filled on write. Authors with too many
+    followers to fan out on write are merged in by reading their entries directly.
+    Raises ValueError for a malformed cursor.
+    """
+    # The cursor holds the creation time and id of the last entry of the previous page
+    after = parse_cursor_values(InboxItem, INBOX_ORDERING, decode_cursor(cursor)) if cursor else None
+
+    inbox = InboxItem.objects.filter(owner=user)
+    if after:
+        inbox = inbox.filter(keyset_filter(INBOX_ORDERING, after))
+    candidates = list(
+        inbox.order_by(*INBOX_ORDERING).values_list('created_at', 'entry_id')[:per_page + 1]
+    )
+
+    # Fan-out-on-read fallback for authors with huge follower counts
+    pulled_author_ids = list(
+        UserProfile.objects.filter(
+            user__followers__user=user, fan_out_on_read=True
+        ).values_list('user_id', flat=True)
+    )
+    if pulled_author_ids:
+        pulled = DiaryEntry.objects.filter(user_id__in=pulled_author_ids)
+        if after:
+            pulled = pulled.filter(keyset_filter(FEED_ORDERING, after))
+        candidates = sorted(
+            set(candidates) | set(pulled.order_by(*FEED_ORDERING).values_list('created_at', 'id')[:per_page + 1]),
+            reverse=True
+        )
+
+    page = candidates[:per_page]
+    entries_by_id = DiaryEntry.objects.select_related('user').prefetch_related('tags').defer(
+        'content', 'content_html'
+    ).order_by().in_bulk([entry_id for _, entry_id in page])
+    entries = [entries_by_id[entry_id] for _, entry_id in page if entry_id in entries_by_id]
+
+    next_cursor = encode_cursor(page[-1]) if len(candidates) > per_page else None
+    return entries, next_cursor
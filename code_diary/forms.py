@@ -38,6 +38,10 @@ class DiaryEntryForm(forms.ModelForm):
             'content': forms.Textarea(attrs={'class': 'form-control', 'rows': 6}),
             'technologies': forms.TextInput(attrs={'class': 'form-control'}),
         }
+        help_texts = {
+            'content': "Describe what you coded today. Markdown is supported, including ``` fenced code blocks "
+                       "with a language name for syntax highlighting.",
+        }
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -0,0 +1,73 @@
+import json
+import time
+from contextlib import ExitStack, contextmanager
+from functools import cache
+from pathlib import Path
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connections
+from django.dispatch import receiver
+
+QUERY_BUDGETS_FILE = Path(__file__).resolve().parent / 'query_budgets.json'
+
+
+class QueryStats:
+    """Query count, total DB time and slowest query of a block of code.
+
+    Instances are installed as an execute wrapper on every database connection, so they work without DEBUG.
+    """
+
+    def __init__(self):
+        self.url_name = None
+        self.count = 0
+        self.duration = 0.0
+        self.slowest_duration = 0.0
+        self.slowest_sql = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.duration += elapsed
+            if self.slowest_sql is None or elapsed > self.slowest_duration:
+                self.slowest_duration = elapsed
+                self.slowest_sql = sql
+
+    def __repr__(self):
+        return (
+            f'<QueryStats {self.url_name or "-"}: {self.count} queries in {self.duration * 1000:.1f}ms, '
+            f'slowest {self.slowest_duration * 1000:.1f}ms>'
+        )
+
+
+@contextmanager
+def record_queries():
+    """Record the queries run on any database connection inside the block into a QueryStats."""
+    stats = QueryStats()
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(stats))
+        yield stats
+
+
+@cache
+def get_query_budgets():
+    """Return the maximum number of queries per URL name from CODE_DIARY_QUERY_BUDGETS_FILE."""
+    path = getattr(settings, 'CODE_DIARY_QUERY_BUDGETS_FILE', QUERY_BUDGETS_FILE)
+    with open(path) as budgets_file:
+        return json.load(budgets_file)
+
+
+def get_query_budget(url_name):
+    """Return the query budget of a URL name, or None when it has none."""
+    return get_query_budgets().get(url_name)
+
+
+@receiver(setting_changed)
+def reset_query_budgets(setting, **kwargs):
+    if setting == 'CODE_DIARY_QUERY_BUDGETS_FILE':
+        get_query_budgets.cache_clear()
@@ -0,0 +1,224 @@
+import asyncio
+import importlib
+import threading
+import time
+from collections import defaultdict
+from itertools import count
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from code_diary.testing import use_async_views
+
+from .benchmark_connections import wsgi_request
+from .benchmark_database import percentile
+
+SERVERS = ('wsgi', 'asgi')
+# Each client repeats this cycle: poll for new entries, follow its neighbour, poll again, unfollow
+ENDPOINTS = ('check_new_entries', 'follow_user', 'check_new_entries', 'unfollow_user')
+
+
+async def asgi_request(handler, path, host, method='GET', headers=None):
+    """Send a request through an ASGI handler like a server would, and return the response status code."""
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'root_path': '',
+        'query_string': b'',
+        'headers': [(b'host', host.encode())] + [
+            (name.lower().encode(), value.encode()) for name, value in (headers or {}).items()
+        ],
+        'client': ('127.0.0.1', 0),
+        'server': (host, 80),
+    }
+    received = False
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # Like a keep-alive client, never disconnect
+        await asyncio.Future()
+
+    status = []
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await handler(scope, receive, send)
+    return status[0]
+
+
+class Client:
+    """A logged in benchmark user, with the requests of its cycle through the benchmarked endpoints."""
+
+    def __init__(self, user, neighbour):
+        session = importlib.import_module(settings.SESSION_ENGINE).SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        self.session = session
+        csrf_token = get_random_string(32)
+        cookie = f'{settings.SESSION_COOKIE_NAME}={session.session_key}; {settings.CSRF_COOKIE_NAME}={csrf_token}'
+        self.requests = []
+        for name in ENDPOINTS:
+            if name == 'check_new_entries':
+                request = ('GET', reverse('code_diary:check_new_entries'), {
+                    'Cookie': cookie, 'X-Requested-With': 'XMLHttpRequest',
+                }, 200)
+            else:
+                request = ('POST', reverse(f'code_diary:{name}', args=[neighbour.username]), {
+                    'Cookie': cookie, 'X-CSRFToken': csrf_token,
+                }, 302)
+            self.requests.append((name, *request))
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the follow, unfollow and new entries endpoints served by the WSGI handler with their sync "
+        "views, one thread per concurrent client, against the ASGI handler with their async views, all clients "
+        "on one event loop. Benchmark users and their sessions are deleted afterwards; run it against a copy "
+        "of the production database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=64,
+            help="Concurrent clients, each sending its next request when the previous one is answered (default: 64)",
+        )
+        parser.add_argument(
+            '--requests', type=int, default=100,
+            help="Requests sent by each client for each server (default: 100)",
+        )
+        parser.add_argument(
+            '--server', choices=SERVERS, action='append', dest='servers',
+            help="Server interface to benchmark, may be repeated (default: both)",
+        )
+        parser.add_argument(
+            '--host', default='localhost',
+            help="Host header sent, which must be in ALLOWED_HOSTS (default: localhost)",
+        )
+        parser.add_argument(
+            '--user-prefix', default='async-benchmark',
+            help="Prefix of the benchmark usernames (default: async-benchmark)",
+        )
+        parser.add_argument(
+            '--keep', action='store_true',
+            help="Keep the benchmark users and sessions instead of deleting them",
+        )
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 2 or options['requests'] < 1:
+            raise CommandError("--concurrency must be at least 2 and --requests positive")
+        prefix = options['user_prefix']
+        if User.objects.filter(username__startswith=f'{prefix}-').exists():
+            raise CommandError(f"Users named {prefix}-* already exist; delete them or pass another --user-prefix")
+
+        users = [User.objects.create_user(f'{prefix}-{number}') for number in range(options['concurrency'])]
+        clients = []
+        try:
+            # Each client follows and unfollows the next one
+            for index, user in enumerate(users):
+                clients.append(Client(user, users[(index + 1) % len(users)]))
+            # Setting up opened the main thread's connection; the servers open their own
+            connections.close_all()
+            self.stdout.write(
+                f"{connections['default'].vendor} database, {len(clients)} concurrent clients, "
+                f"{options['requests']} requests each"
+            )
+            self.stdout.write(f"{'':<22}{'requests':>9}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'connects':>10}")
+            for server in options['servers'] or SERVERS:
+                with use_async_views(server == 'asgi'):
+                    self.run(server, clients, options['host'], options['requests'])
+        finally:
+            if not options['keep']:
+                User.objects.filter(pk__in=[user.pk for user in users]).delete()
+                for client in clients:
+                    client.session.delete()
+
+    def run(self, server, clients, host, requests):
+        connects = count()
+
+        def count_connect(**kwargs):
+            next(connects)
+
+        latencies = defaultdict(list)
+        failures = count()
+
+        def record(name, started, status, expected):
+            latencies[name].append(time.perf_counter() - started)
+            if status != expected:
+                next(failures)
+
+        connection_created.connect(count_connect, weak=False)
+        try:
+            started = time.perf_counter()
+            if server == 'wsgi':
+                self.run_wsgi(clients, host, requests, record)
+            else:
+                asyncio.run(self.run_asgi(clients, host, requests, record))
+            elapsed = time.perf_counter() - started
+        finally:
+            connection_created.disconnect(count_connect)
+
+        total = sorted(value for values in latencies.values() for value in values)
+        rows = [(f"{server} views", total)] + [(f"  {name}", sorted(latencies[name])) for name in dict.fromkeys(ENDPOINTS)]
+        for index, (label, values) in enumerate(rows):
+            self.stdout.write(
+                f"{label:<22}{len(values):>9}{len(values) / max(elapsed, 1e-6):>9.0f}"
+                + ''.join(f"{percentile(values, fraction) * 1000:>9.1f}" for fraction in (0.5, 0.95, 0.99))
+                + (f"{next(connects):>10}" if index == 0 else '')
+            )
+        failed = next(failures)
+        if failed:
+            self.stdout.write(self.style.WARNING(f"{failed} request(s) did not return the expected status"))
+
+    def run_wsgi(self, clients, host, requests, record):
+        """Serve the clients with the sync views, from a thread each like a threaded WSGI server."""
+        handler = WSGIHandler()
+        barrier = threading.Barrier(len(clients))
+
+        def worker(client):
+            try:
+                barrier.wait()
+                for number in range(requests):
+                    name, method, path, headers, expected = client.requests[number % len(client.requests)]
+                    started = time.perf_counter()
+                    record(name, started, wsgi_request(handler, path, host, method, headers), expected)
+            finally:
+                # Like a server thread exiting, even a persistent connection ends here
+                connections['default'].close()
+
+        threads = [threading.Thread(target=worker, args=(client,)) for client in clients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    async def run_asgi(self, clients, host, requests, record):
+        """Serve the clients with the async views, all from one event loop like an ASGI server."""
+        handler = ASGIHandler()
+
+        async def client_requests(client):
+            for number in range(requests):
+                name, method, path, headers, expected = client.requests[number % len(client.requests)]
+                started = time.perf_counter()
+                record(name, started, await asgi_request(handler, path, host, method, headers), expected)
+
+        await asyncio.gather(*(client_requests(client) for client in clients))
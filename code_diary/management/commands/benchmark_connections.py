@@ -0,0 +1,142 @@
+import threading
+import time
+from io import BytesIO
+from itertools import count
+from wsgiref.util import setup_testing_defaults
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.urls import reverse
+
+from .benchmark_database import percentile
+
+MODES = ('close', 'persistent', 'pool')
+
+
+def wsgi_request(handler, path, host, method='GET', headers=None):
+    """Send a request through a WSGI handler, which opens and releases connections like a server.
+
+    Return the response status code.
+    """
+    environ = {'REQUEST_METHOD': method, 'PATH_INFO': path, 'HTTP_HOST': host, 'wsgi.input': BytesIO()}
+    for name, value in (headers or {}).items():
+        environ[f"HTTP_{name.upper().replace('-', '_')}"] = value
+    setup_testing_defaults(environ)
+    status = []
+    response = handler(environ, lambda response_status, headers: status.append(response_status))
+    for _ in response:
+        pass
+    # Sends request_finished, which closes the connections past their CONN_MAX_AGE
+    response.close()
+    return int(status[0].split()[0])
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the requests per second of a page served through the WSGI handler from many threads when "
+        "database connections are closed after each request, kept open (CONN_MAX_AGE) and pooled "
+        "(PostgreSQL only). Point DATABASE_URL at the database to benchmark, e.g. a local PostgreSQL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads', type=int, default=8,
+            help="Concurrent threads sending requests, like the threads of a WSGI server (default: 8)",
+        )
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help="Requests sent by each thread in each mode (default: 200)",
+        )
+        parser.add_argument(
+            '--path',
+            help="Page requested (default: the user directory, which queries the database on every request)",
+        )
+        parser.add_argument(
+            '--host', default='localhost',
+            help="Host header sent, which must be in ALLOWED_HOSTS (default: localhost)",
+        )
+        parser.add_argument(
+            '--mode', choices=MODES, action='append', dest='modes',
+            help="Connection handling to benchmark, may be repeated (default: all that the database supports)",
+        )
+        parser.add_argument(
+            '--conn-max-age', type=int, default=60,
+            help="CONN_MAX_AGE of the persistent mode (default: 60)",
+        )
+
+    def handle(self, *args, **options):
+        if options['threads'] < 1 or options['requests'] < 1:
+            raise CommandError("--threads and --requests must be positive")
+        connection = connections['default']
+        modes = options['modes'] or [mode for mode in MODES if mode != 'pool' or connection.vendor == 'postgresql']
+        if 'pool' in modes and connection.vendor != 'postgresql':
+            raise CommandError("Connection pooling is only supported with PostgreSQL")
+        path = options['path'] or reverse('code_diary:user_list')
+        self.handler = WSGIHandler()
+        self.stdout.write(f"{connection.vendor} database {connection.settings_dict['NAME']!r}, GET {path}")
+        self.stdout.write(f"{'':<12}{'requests':>9}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'connects':>10}")
+
+        # The connections are created from this settings dict, so changing it switches the mode
+        settings_dict = connection.settings_dict
+        original = {'CONN_MAX_AGE': settings_dict['CONN_MAX_AGE'], 'OPTIONS': settings_dict['OPTIONS']}
+        connections.close_all()
+        try:
+            for mode in modes:
+                settings_dict['OPTIONS'] = dict(original['OPTIONS'])
+                if mode == 'pool':
+                    settings_dict['CONN_MAX_AGE'] = 0
+                    settings_dict['OPTIONS'].setdefault('pool', True)
+                else:
+                    settings_dict['CONN_MAX_AGE'] = options['conn_max_age'] if mode == 'persistent' else 0
+                    settings_dict['OPTIONS'].pop('pool', None)
+                self.run(mode, path, options['host'], options['threads'], options['requests'])
+        finally:
+            settings_dict.update(original)
+
+    def run(self, mode, path, host, threads, requests):
+        connects = count()
+
+        def count_connect(**kwargs):
+            next(connects)
+
+        barrier = threading.Barrier(threads)
+        latencies = [[] for _ in range(threads)]
+        failures = count()
+
+        def worker(index):
+            try:
+                barrier.wait()
+                for _ in range(requests):
+                    started = time.perf_counter()
+                    if wsgi_request(self.handler, path, host) != 200:
+                        next(failures)
+                    latencies[index].append(time.perf_counter() - started)
+            finally:
+                # Like a server thread exiting, even a persistent connection ends here
+                connections['default'].close()
+
+        connection_created.connect(count_connect, weak=False)
+        try:
+            workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+            started = time.perf_counter()
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+            elapsed = time.perf_counter() - started
+        finally:
+            connection_created.disconnect(count_connect)
+            if mode == 'pool':
+                connections['default'].close_pool()
+
+        values = sorted(value for thread_latencies in latencies for value in thread_latencies)
+        self.stdout.write(
+            f"{mode:<12}{len(values):>9}{len(values) / max(elapsed, 1e-6):>9.0f}"
+            + ''.join(f"{percentile(values, fraction) * 1000:>9.1f}" for fraction in (0.5, 0.95, 0.99))
+            + f"{next(connects):>10}"
+        )
+        failed = next(failures)
+        if failed:
+            self.stdout.write(self.style.WARNING(f"{failed} request(s) did not return 200 OK"))
@@ -0,0 +1,230 @@
+import random
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, transaction
+
+from code_diary.models import DiaryEntry, ReadMarker
+
+OPERATIONS = ('create', 'update', 'read', 'receipt')
+WRITE_OPERATIONS = ('create', 'update', 'receipt')
+DEFAULT_MIX = 'create=2,update=2,read=12,receipt=4'
+REPORTED_PRAGMAS = ('journal_mode', 'synchronous', 'busy_timeout', 'mmap_size', 'cache_size')
+# The first statement of a write transaction that needs the write lock: BEGIN IMMEDIATE or EXCLUSIVE
+# takes it up front, a plain BEGIN only when the transaction first writes
+LOCKING_SQL_RE = re.compile(r'\s*(BEGIN\s+(IMMEDIATE|EXCLUSIVE)|INSERT|UPDATE|DELETE|REPLACE)\b', re.IGNORECASE)
+
+
+def parse_mix(text):
+    """Parse an operation mix like 'create=1,read=4' into a dict of operation weights."""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS or not weight.strip().isdigit():
+            raise CommandError(f"Invalid --mix item {part!r}, expected <{'|'.join(OPERATIONS)}>=<weight>")
+        mix[name] = int(weight)
+    if not any(mix.values()):
+        raise CommandError("--mix needs at least one operation with a positive weight")
+    return mix
+
+
+def percentile(values, fraction):
+    """Return the nearest-rank percentile of sorted `values`."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, round(fraction * len(values)) - 1))]
+
+
+class LockWaitRecorder:
+    """Execute wrapper timing the statement that takes the write lock in each write transaction.
+
+    With busy_timeout set, SQLite blocks in that statement while another connection holds the lock,
+    so its duration is the time the transaction waited for the lock.
+    """
+
+    def __init__(self):
+        self.waiting = False
+        self.waits = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not self.waiting or not LOCKING_SQL_RE.match(sql):
+            return execute(sql, params, many, context)
+        self.waiting = False
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.waits.append(time.perf_counter() - started)
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammer the database with concurrent entry creates, updates, reads and read receipts from many "
+        "threads, and report throughput, latency and write lock wait percentiles. Benchmark users and "
+        "their entries are deleted afterwards; run it against a copy of the production database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads', type=int, default=8,
+            help="Concurrent threads, each with its own connection and benchmark user (default: 8)",
+        )
+        parser.add_argument(
+            '--operations', type=int, default=250,
+            help="Operations run by each thread (default: 250)",
+        )
+        parser.add_argument(
+            '--mix', default=DEFAULT_MIX,
+            help=f"Relative weights of the {', '.join(OPERATIONS)} operations (default: {DEFAULT_MIX})",
+        )
+        parser.add_argument(
+            '--seed-entries', type=int, default=10,
+            help="Entries created for each benchmark user before the run (default: 10)",
+        )
+        parser.add_argument(
+            '--user-prefix', default='benchmark',
+            help="Prefix of the benchmark usernames (default: benchmark)",
+        )
+        parser.add_argument(
+            '--keep', action='store_true',
+            help="Keep the benchmark users and entries instead of deleting them",
+        )
+
+    def handle(self, *args, **options):
+        if options['threads'] < 1 or options['operations'] < 1 or options['seed_entries'] < 1:
+            raise CommandError("--threads, --operations and --seed-entries must be positive")
+        mix = parse_mix(options['mix'])
+        prefix = options['user_prefix']
+        if User.objects.filter(username__startswith=f'{prefix}-').exists():
+            raise CommandError(f"Users named {prefix}-* already exist; delete them or pass another --user-prefix")
+
+        self.report_settings()
+        users = [User.objects.create_user(f'{prefix}-{number}') for number in range(options['threads'])]
+        self.entry_ids = []
+        self.entry_ids_lock = threading.Lock()
+        try:
+            for user in users:
+                for number in range(options['seed_entries']):
+                    self.entry_ids.append(self.create_entry(user, number).pk)
+            # Seeding opened the main thread's connection; the workers open their own
+            connection.close()
+            self.run(users, mix, options['operations'])
+        finally:
+            if not options['keep']:
+                User.objects.filter(pk__in=[user.pk for user in users]).delete()
+
+    def report_settings(self):
+        if connection.vendor != 'sqlite':
+            self.stdout.write(f"Database: {connection.vendor}")
+            return
+        with connection.cursor() as cursor:
+            values = []
+            for pragma in REPORTED_PRAGMAS:
+                cursor.execute(f'PRAGMA {pragma}')
+                row = cursor.fetchone()
+                # In-memory databases have no value for some pragmas, like mmap_size
+                values.append(f"{pragma}={row[0] if row else '-'}")
+        self.stdout.write(f"SQLite: {' '.join(values)} transaction_mode={connection.transaction_mode or 'DEFERRED'}")
+
+    def run(self, users, mix, operations):
+        names, weights = zip(*mix.items())
+        barrier = threading.Barrier(len(users))
+        results = [None] * len(users)
+
+        def worker(index, user):
+            rng = random.Random(index)
+            latencies = defaultdict(list)
+            errors = Counter()
+            recorder = LockWaitRecorder()
+            try:
+                with connection.execute_wrapper(recorder):
+                    barrier.wait()
+                    for number in range(operations):
+                        name = rng.choices(names, weights)[0]
+                        recorder.waiting = name in WRITE_OPERATIONS
+                        started = time.perf_counter()
+                        try:
+                            self.run_operation(name, user, rng, number)
+                        except DatabaseError as error:
+                            errors[f"{name}: {error}"] += 1
+                        else:
+                            latencies[name].append(time.perf_counter() - started)
+            finally:
+                results[index] = (latencies, errors, recorder.waits)
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(index, user)) for index, user in enumerate(users)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        latencies = defaultdict(list)
+        errors = Counter()
+        waits = []
+        for thread_latencies, thread_errors, thread_waits in results:
+            for name, values in thread_latencies.items():
+                latencies[name].extend(values)
+            errors.update(thread_errors)
+            waits.extend(thread_waits)
+        self.report(len(users), elapsed, latencies, errors, waits)
+
+    def run_operation(self, name, user, rng, number):
+        if name == 'read':
+            # The home page list, then an entry page
+            entries = list(
+                DiaryEntry.objects.select_related('user').defer('content', 'content_html')
+                .order_by('-date', '-created_at')[:20]
+            )
+            DiaryEntry.objects.select_related('user').get(pk=rng.choice(entries).pk)
+            return
+        with transaction.atomic():
+            if name == 'create':
+                entry = self.create_entry(user, number)
+                # Only committed entries may be picked by the other threads
+                transaction.on_commit(lambda: self.add_entry_id(entry.pk))
+            elif name == 'update':
+                entry = DiaryEntry.objects.get(pk=rng.choice(self.entry_ids))
+                entry.content += f"\n\nEdited by {user.username}."
+                entry.save()
+            else:
+                ReadMarker.record_read(user, DiaryEntry(pk=rng.choice(self.entry_ids)))
+
+    def add_entry_id(self, entry_id):
+        with self.entry_ids_lock:
+            self.entry_ids.append(entry_id)
+
+    def create_entry(self, user, number):
+        return DiaryEntry.objects.create(
+            user=user,
+            title=f"Benchmark entry {number}",
+            content=f"Benchmarking **concurrent writes** from {user.username}.\n\n```python\nprint({number})\n```",
+            technologies='Python, SQLite',
+        )
+
+    def report(self, threads, elapsed, latencies, errors, waits):
+        completed = sum(map(len, latencies.values()))
+        failed = sum(errors.values())
+        self.stdout.write(
+            f"{threads} threads ran {completed + failed} operations in {elapsed:.2f}s: "
+            f"{completed / max(elapsed, 1e-6):.0f} ops/s, {failed} failed"
+        )
+        self.stdout.write(f"{'':<12}{'count':>8}{'ops/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+        rows = [(name, latencies[name]) for name in OPERATIONS if latencies[name]]
+        rows.append(('lock wait', waits))
+        for name, values in rows:
+            values = sorted(values)
+            self.stdout.write(
+                f"{name:<12}{len(values):>8}{len(values) / max(elapsed, 1e-6):>9.0f}"
+                + ''.join(f"{percentile(values, fraction) * 1000:>9.1f}" for fraction in (0.5, 0.95, 0.99))
+                + f"{(values[-1] if values else 0) * 1000:>9.1f}"
+            )
+        for message, count in errors.most_common():
+            self.stdout.write(self.style.WARNING(f"{count} x {message}"))
@@ -0,0 +1,50 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from code_diary.export import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, iter_export
+
+
+class Command(BaseCommand):
+    help = "Dump a user's diary entries as JSONL, CSV or Markdown, streaming them in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help="User whose entries are exported")
+        parser.add_argument(
+            '--format', choices=EXPORT_FORMATS, default='jsonl',
+            help="Output format (default: jsonl, which import_entries reads back)",
+        )
+        parser.add_argument(
+            '--since',
+            help="Only export entries from this date (YYYY-MM-DD) on, to resume an interrupted dump",
+        )
+        parser.add_argument(
+            '--output', '-o',
+            help="File to write to (default: standard output)",
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=EXPORT_CHUNK_SIZE,
+            help=f"Entries read from the database at a time (default: {EXPORT_CHUNK_SIZE})",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"Unknown user {options['username']!r}")
+        since = None
+        if options['since']:
+            try:
+                since = parse_date(options['since'])
+            except ValueError:
+                since = None
+            if since is None:
+                raise CommandError(f"Invalid --since date {options['since']!r}, expected YYYY-MM-DD")
+
+        chunks = iter_export(user, options['format'], since, options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+                output.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
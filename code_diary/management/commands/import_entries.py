@@ -0,0 +1,163 @@
+import csv
+import json
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from code_diary.caching import bump_entries_version, bump_user_versions
+from code_diary.forms import DiaryEntryForm
+from code_diary.models import (
+    DiaryEntry, UserProfile, bulk_deliver_entries, bulk_tag_entries, rebuild_technology_usage,
+    recount_profile_counters,
+)
+
+FORMATS = ('jsonl', 'csv')
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk import diary entries from a JSONL or CSV file with date, title, content, technologies and "
+        "optionally user fields. Rows are validated like DiaryEntryForm; rejected rows are written to a side file. "
+        "Imported entries reach the followers' feeds and unread entries, but no live notifications are pushed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="JSONL or CSV file to import")
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help="Input format (default: guessed from the file extension)",
+        )
+        parser.add_argument(
+            '--user',
+            help="Username the entries belong to, for rows without a user field",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help="Entries inserted per bulk_create() (default: 500)",
+        )
+        parser.add_argument(
+            '--batches-per-transaction', type=int, default=10,
+            help="Batches committed together in one transaction (default: 10)",
+        )
+        parser.add_argument(
+            '--rejects',
+            help="File the rejected rows are written to as JSONL (default: <path>.rejected.jsonl)",
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f"{path} does not exist")
+        input_format = options['format'] or path.suffix.lstrip('.').lower()
+        if input_format not in FORMATS:
+            raise CommandError(f"Cannot guess the format of {path}; pass --format {' or '.join(FORMATS)}")
+        if options['batch_size'] < 1 or options['batches_per_transaction'] < 1:
+            raise CommandError("--batch-size and --batches-per-transaction must be positive")
+        self.default_username = options['user']
+        self.user_ids = {}
+        rejects_path = Path(options['rejects'] or f'{path}.rejected.jsonl')
+
+        imported = rejected = 0
+        user_ids = set()
+        started = time.monotonic()
+        transaction_size = options['batch_size'] * options['batches_per_transaction']
+        with open(path, newline='', encoding='utf-8') as source, open(rejects_path, 'w', encoding='utf-8') as rejects:
+            rows = self.read_rows(source, input_format)
+            while chunk := list(islice(rows, transaction_size)):
+                entries = []
+                for line, row in chunk:
+                    entry, errors = self.build_entry(row)
+                    if errors:
+                        rejects.write(json.dumps({'line': line, 'errors': errors, 'row': row}) + '\n')
+                        rejected += 1
+                    else:
+                        entries.append(entry)
+                with transaction.atomic():
+                    for start in range(0, len(entries), options['batch_size']):
+                        batch = DiaryEntry.objects.bulk_create(entries[start:start + options['batch_size']])
+                        bulk_tag_entries(batch)
+                        bulk_deliver_entries(batch)
+                imported += len(entries)
+                user_ids.update(entry.user_id for entry in entries)
+                elapsed = time.monotonic() - started
+                if options['verbosity'] >= 1:
+                    self.stdout.write(
+                        f"{imported + rejected} rows read: {imported} imported, {rejected} rejected "
+                        f"({(imported + rejected) / max(elapsed, 1e-6):.0f} rows/s)"
+                    )
+
+        # bulk_create() skips the signals maintaining the derived data, so refresh it once for the affected users
+        if user_ids:
+            users = User.objects.filter(pk__in=user_ids)
+            recount_profile_counters(UserProfile.objects.filter(user__in=users))
+            rebuild_technology_usage(users)
+            bump_entries_version()
+            bump_user_versions(user_ids)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {imported} entries in {elapsed:.1f}s ({imported / max(elapsed, 1e-6):.0f} entries/s)."
+        ))
+        if rejected:
+            self.stdout.write(self.style.WARNING(f"Rejected {rejected} row(s), written to {rejects_path}."))
+
+    def read_rows(self, source, input_format):
+        """Yield (line number, row dict) pairs one at a time, so memory stays flat whatever the file size."""
+        if input_format == 'csv':
+            reader = csv.DictReader(source)
+            for row in reader:
+                yield reader.line_num, row
+            return
+        for line, text in enumerate(source, start=1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except ValueError:
+                row = None
+            yield line, row if isinstance(row, dict) else {'_raw': text.rstrip('\n')}
+
+    def get_user_id(self, username):
+        """Return the id of a user by username, remembering the lookups, or None when there is no such user."""
+        if username not in self.user_ids:
+            self.user_ids[username] = User.objects.filter(username=username).values_list('pk', flat=True).first()
+        return self.user_ids[username]
+
+    def check_types(self, row):
+        """Return errors for the fields of a JSON row whose values are not strings, as the form expects."""
+        errors = {}
+        for field in ('user', *DiaryEntryForm.base_fields):
+            value = row.get(field)
+            if field == 'technologies' and isinstance(value, list):
+                if not all(isinstance(item, str) for item in value):
+                    errors[field] = ["Expected a string or a list of strings"]
+            elif value is not None and not isinstance(value, str):
+                errors[field] = ["Expected a string"]
+        return errors
+
+    def build_entry(self, row):
+        """Validate a row with DiaryEntryForm and return an unsaved entry and the validation errors."""
+        if '_raw' in row:
+            return None, {'__all__': ["Not a JSON object"]}
+        errors = self.check_types(row)
+        if errors:
+            return None, errors
+        username = row.get('user') or self.default_username
+        user_id = self.get_user_id(username) if username else None
+        if user_id is None:
+            return None, {'user': [f"Unknown user {username!r}" if username else "No user given"]}
+
+        data = dict(row)
+        if isinstance(data.get('technologies'), list):
+            data['technologies'] = ', '.join(data['technologies'])
+        form = DiaryEntryForm(data=data, instance=DiaryEntry(user_id=user_id))
+        if not form.is_valid():
+            return None, {field: list(messages) for field, messages in form.errors.items()}
+        entry = form.save(commit=False)
+        # bulk_create() does not call save(), which renders the content
+        entry.render_content()
+        return entry, None
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from code_diary.models import UnreadEntry
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the unread state of entries older than the new entries window, which the banner no longer "
+        "shows. Run it on a schedule, for example daily."
+    )
+
+    def handle(self, *args, **options):
+        deleted = UnreadEntry.prune()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired unread entry row(s)."))
@@ -0,0 +1,21 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from code_diary.models import rebuild_technology_usage
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-user weekly and monthly technology usage rollups from the entries' tags."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help="Only rebuild the rollups of these users (default: all users)",
+        )
+
+    def handle(self, *args, **options):
+        users = None
+        if options['usernames']:
+            users = User.objects.filter(username__in=options['usernames'])
+        written = rebuild_technology_usage(users)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} technology usage rollup(s)."))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from code_diary.caching import bump_user_versions
+from code_diary.models import UserProfile, recount_profile_counters
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized entry, follower and following counters of user profiles."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help="Only recount the profiles of these users (default: all profiles)",
+        )
+
+    def handle(self, *args, **options):
+        profiles = UserProfile.objects.all()
+        if options['usernames']:
+            profiles = profiles.filter(user__username__in=options['usernames'])
+        repaired = recount_profile_counters(profiles)
+        if repaired:
+            # The counters are shown in cached pages
+            bump_user_versions(profiles.values_list('user_id', flat=True))
+        self.stdout.write(self.style.SUCCESS(f"Repaired the counters of {repaired} profile(s)."))
@@ -0,0 +1,116 @@
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+from .instrumentation import get_query_budget, record_queries
+from .routers import PIN_COOKIE_NAME, get_pin_seconds, get_replica_aliases, routing_state
+from .social import SocialGraph
+
+logger = logging.getLogger('code_diary.queries')
+
+
+class SocialGraphMiddleware:
+    """Attach a lazily loaded SocialGraph of the current user to each request as request.social_graph.
+
+    Must come after AuthenticationMiddleware.
+    """
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        request.social_graph = SocialGraph(request)
+        return self.get_response(request)
+
+
+class DatabaseRoutingMiddleware:
+    """Track the database routing of each request, for views decorated with replica_reads.
+
+    When a request writes to the primary, its client is pinned to the primary for
+    CODE_DIARY_REPLICA_PIN_SECONDS with a cookie, so the pages it is redirected to show its writes
+    even if the replicas lag behind. Must come before SessionMiddleware, which may write the session.
+    """
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with routing_state() as state:
+            response = self.get_response(request)
+        return self.pin_to_primary(request, response, state)
+
+    async def __acall__(self, request):
+        # The async ORM copies the context, and so the routing state, into the threads it queries from
+        with routing_state() as state:
+            response = await self.get_response(request)
+        return self.pin_to_primary(request, response, state)
+
+    def pin_to_primary(self, request, response, state):
+        if state.wrote and get_replica_aliases():
+            response.set_cookie(
+                PIN_COOKIE_NAME, '1', max_age=get_pin_seconds(), httponly=True, samesite='Lax',
+                secure=request.is_secure(),
+            )
+        return response
+
+
+class QueryInstrumentationMiddleware:
+    """Record the query count, DB time and slowest query of each request as request.query_stats.
+
+    Every request is logged on the ``code_diary.queries`` logger tagged with its URL name, as a warning when
+    the view went over its budget in query_budgets.json. With DEBUG on, the numbers are also sent in a
+    Server-Timing header for the browser's developer tools.
+    """
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with record_queries() as stats:
+            response = self.get_response(request)
+        return self.log_queries(request, response, stats)
+
+    async def __acall__(self, request):
+        # Connections belong to a thread, and the async ORM queries from the request's sync thread, so the
+        # recorder is installed on that thread's connections
+        recorder = record_queries()
+        stats = await sync_to_async(recorder.__enter__)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(recorder.__exit__)(None, None, None)
+        return self.log_queries(request, response, stats)
+
+    def log_queries(self, request, response, stats):
+        if request.resolver_match:
+            stats.url_name = request.resolver_match.view_name
+        request.query_stats = stats
+
+        budget = get_query_budget(stats.url_name)
+        level = logging.WARNING if budget is not None and stats.count > budget else logging.DEBUG
+        logger.log(
+            level,
+            "%s %s: %d queries (budget %s) in %.1fms, slowest %.1fms: %s",
+            request.method, stats.url_name or request.path, stats.count, budget,
+            stats.duration * 1000, stats.slowest_duration * 1000, stats.slowest_sql,
+        )
+        if settings.DEBUG:
+            response['Server-Timing'] = f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries"'
+        return response
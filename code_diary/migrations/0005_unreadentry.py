@@ -0,0 +1,105 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_unread_entries(apps, schema_editor):
+    """Populate unread state for recent entries from followed users."""
+    DiaryEntry = apps.get_model("code_diary", "DiaryEntry")
+    ReadEntry = apps.get_model("code_diary", "ReadEntry")
+    UnreadEntry = apps.get_model("code_diary", "UnreadEntry")
+    UserProfile = apps.get_model("code_diary", "UserProfile")
+
+    recent_entries = DiaryEntry.objects.filter(
+        created_at__gt=timezone.now() - timezone.timedelta(days=1)
+    )
+    follows = UserProfile.following.through.objects.filter(
+        user_id__in=recent_entries.values("user_id")
+    ).values_list("userprofile__user_id", "user_id")
+    followers_by_author = {}
+    for follower_id, author_id in follows:
+        followers_by_author.setdefault(author_id, []).append(follower_id)
+
+    read = set(
+        ReadEntry.objects.filter(entry__in=recent_entries).values_list(
+            "user_id", "entry_id"
+        )
+    )
+    unread = [
+        UnreadEntry(
+            user_id=follower_id,
+            entry_id=entry.id,
+            author_id=entry.user_id,
+            created_at=entry.created_at,
+        )
+        for entry in recent_entries.only("id", "user_id", "created_at")
+        for follower_id in followers_by_author.get(entry.user_id, [])
+        if (follower_id, entry.id) not in read
+    ]
+    UnreadEntry.objects.bulk_create(unread, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("code_diary", "0004_readentry_diaryentry_readers"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UnreadEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(help_text="Copy of the entry's creation time"),
+                ),
+                (
+                    "author",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "entry",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="unread_by",
+                        to="code_diary.diaryentry",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="unread_entries",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Unread Entries",
+                "indexes": [
+                    models.Index(
+                        fields=["user", "created_at"], name="unread_user_created_idx"
+                    )
+                ],
+                "unique_together": {("user", "entry")},
+            },
+        ),
+        migrations.RunPython(backfill_unread_entries, migrations.RunPython.noop),
+    ]
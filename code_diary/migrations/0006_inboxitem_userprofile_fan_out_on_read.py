@@ -0,0 +1,111 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_inboxes(apps, schema_editor):
+    """Fill the inboxes with the latest entries of every followed author."""
+    DiaryEntry = apps.get_model("code_diary", "DiaryEntry")
+    InboxItem = apps.get_model("code_diary", "InboxItem")
+    UserProfile = apps.get_model("code_diary", "UserProfile")
+
+    follows = UserProfile.following.through.objects.values_list(
+        "userprofile__user_id", "user_id"
+    )
+    followers_by_author = {}
+    for follower_id, author_id in follows.iterator():
+        followers_by_author.setdefault(author_id, []).append(follower_id)
+
+    for author_id, follower_ids in followers_by_author.items():
+        latest_entries = (
+            DiaryEntry.objects.filter(user_id=author_id)
+            .order_by("-created_at", "-id")
+            .values_list("id", "created_at")[:20]
+        )
+        InboxItem.objects.bulk_create(
+            [
+                InboxItem(
+                    owner_id=follower_id,
+                    entry_id=entry_id,
+                    author_id=author_id,
+                    created_at=created_at,
+                )
+                for follower_id in follower_ids
+                for entry_id, created_at in latest_entries
+            ],
+            batch_size=500,
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("code_diary", "0005_unreadentry"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userprofile",
+            name="fan_out_on_read",
+            field=models.BooleanField(
+                default=False,
+                help_text="Followers read this user's entries directly instead of through their inbox",
+            ),
+        ),
+        migrations.CreateModel(
+            name="InboxItem",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(help_text="Copy of the entry's creation time"),
+                ),
+                (
+                    "author",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "entry",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="inbox_items",
+                        to="code_diary.diaryentry",
+                    ),
+                ),
+                (
+                    "owner",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="inbox_items",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["owner", "-created_at", "-entry"],
+                        name="inbox_owner_created_idx",
+                    )
+                ],
+                "unique_together": {("owner", "entry")},
+            },
+        ),
+        migrations.RunPython(backfill_inboxes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("code_diary", "0006_inboxitem_userprofile_fan_out_on_read"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name="readentry",
+            unique_together=set(),
+        ),
+        migrations.AddIndex(
+            model_name="diaryentry",
+            index=models.Index(
+                fields=["user", "-date", "-id"], name="entry_user_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="diaryentry",
+            index=models.Index(
+                fields=["user", "created_at"], name="entry_user_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="diaryentry",
+            index=models.Index(
+                fields=["-date", "-created_at"], name="entry_date_created_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="readentry",
+            constraint=models.UniqueConstraint(
+                fields=("user", "entry"), name="readentry_user_entry_uniq"
+            ),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:54
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_counters(apps, schema_editor):
+    """Initialise the profile counters from the existing entries and follows."""
+    DiaryEntry = apps.get_model("code_diary", "DiaryEntry")
+    UserProfile = apps.get_model("code_diary", "UserProfile")
+    Follow = UserProfile.following.through
+
+    def count_of(model, field):
+        return Coalesce(
+            Subquery(
+                model.objects.filter(**{field: OuterRef("user_id")})
+                .order_by()
+                .values(field)
+                .annotate(n=Count("*"))
+                .values("n"),
+                output_field=IntegerField(),
+            ),
+            0,
+        )
+
+    UserProfile.objects.update(
+        entry_count=count_of(DiaryEntry, "user"),
+        follower_count=count_of(Follow, "user"),
+        following_count=count_of(Follow, "userprofile__user"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("code_diary", "0007_diary_access_path_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userprofile",
+            name="entry_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="userprofile",
+            name="follower_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="userprofile",
+            name="following_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:20
+
+from django.db import migrations
+
+# Full-text index mirroring code_diary_diaryentry as an external-content FTS5 table.
+# Triggers keep it in sync for every write, including bulk_create() and update().
+CREATE_SEARCH_INDEX = [
+    """
+    CREATE VIRTUAL TABLE code_diary_diaryentry_fts USING fts5(
+        title, content, technologies,
+        content='code_diary_diaryentry', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER code_diary_diaryentry_fts_insert AFTER INSERT ON code_diary_diaryentry BEGIN
+        INSERT INTO code_diary_diaryentry_fts(rowid, title, content, technologies)
+        VALUES (new.id, new.title, new.content, new.technologies);
+    END
+    """,
+    """
+    CREATE TRIGGER code_diary_diaryentry_fts_delete AFTER DELETE ON code_diary_diaryentry BEGIN
+        INSERT INTO code_diary_diaryentry_fts(code_diary_diaryentry_fts, rowid, title, content, technologies)
+        VALUES ('delete', old.id, old.title, old.content, old.technologies);
+    END
+    """,
+    """
+    CREATE TRIGGER code_diary_diaryentry_fts_update AFTER UPDATE OF title, content, technologies
+    ON code_diary_diaryentry BEGIN
+        INSERT INTO code_diary_diaryentry_fts(code_diary_diaryentry_fts, rowid, title, content, technologies)
+        VALUES ('delete', old.id, old.title, old.content, old.technologies);
+        INSERT INTO code_diary_diaryentry_fts(rowid, title, content, technologies)
+        VALUES (new.id, new.title, new.content, new.technologies);
+    END
+    """,
+    "INSERT INTO code_diary_diaryentry_fts(code_diary_diaryentry_fts) VALUES ('rebuild')",
+]
+
+DROP_SEARCH_INDEX = [
+    "DROP TRIGGER IF EXISTS code_diary_diaryentry_fts_insert",
+    "DROP TRIGGER IF EXISTS code_diary_diaryentry_fts_delete",
+    "DROP TRIGGER IF EXISTS code_diary_diaryentry_fts_update",
+    "DROP TABLE IF EXISTS code_diary_diaryentry_fts",
+]
+
+
+def create_search_index(apps, schema_editor):
+    """Create the FTS5 index and index the existing entries. Other databases search with LIKE."""
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for statement in CREATE_SEARCH_INDEX:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for statement in DROP_SEARCH_INDEX:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("code_diary", "0008_userprofile_counters"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
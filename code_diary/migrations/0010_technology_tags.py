@@ -0,0 +1,138 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:14
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+
+def tag_existing_entries(apps, schema_editor):
+    """Parse the technologies strings of the existing entries into tags.
+
+    Entries are streamed in batches, so memory stays flat however many there are.
+    """
+    DiaryEntry = apps.get_model("code_diary", "DiaryEntry")
+    Technology = apps.get_model("code_diary", "Technology")
+    EntryTechnology = apps.get_model("code_diary", "EntryTechnology")
+    technology_ids = {}
+
+    def flush(batch):
+        names = {}
+        for _, technologies in batch:
+            for name in technologies:
+                if name.lower() not in technology_ids:
+                    names.setdefault(name.lower(), name)
+        if names:
+            Technology.objects.bulk_create(
+                [Technology(name=name, key=key) for key, name in names.items()],
+                ignore_conflicts=True,
+            )
+            technology_ids.update(
+                Technology.objects.filter(key__in=names).values_list("key", "id")
+            )
+        EntryTechnology.objects.bulk_create(
+            [
+                EntryTechnology(
+                    entry_id=entry_id, technology_id=technology_ids[name.lower()]
+                )
+                for entry_id, technologies in batch
+                for name in technologies
+            ],
+            ignore_conflicts=True,
+        )
+
+    batch = []
+    entries = DiaryEntry.objects.order_by().values_list("id", "technologies")
+    for entry_id, technologies in entries.iterator(chunk_size=BATCH_SIZE):
+        names = {}
+        for name in re.split(r"[,\s]+", technologies or ""):
+            if name:
+                names.setdefault(name.lower(), name[:50])
+        batch.append((entry_id, list(names.values())))
+        if len(batch) >= BATCH_SIZE:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("code_diary", "0009_diaryentry_search_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Technology",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=50)),
+                ("key", models.CharField(max_length=50, unique=True)),
+            ],
+            options={
+                "verbose_name_plural": "Technologies",
+            },
+        ),
+        migrations.CreateModel(
+            name="EntryTechnology",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "entry",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="code_diary.diaryentry",
+                    ),
+                ),
+                (
+                    "technology",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="code_diary.technology",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="diaryentry",
+            name="tags",
+            field=models.ManyToManyField(
+                blank=True,
+                related_name="entries",
+                through="code_diary.EntryTechnology",
+                to="code_diary.technology",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="entrytechnology",
+            index=models.Index(
+                fields=["technology", "entry"], name="entrytech_tech_entry_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="entrytechnology",
+            constraint=models.UniqueConstraint(
+                fields=("entry", "technology"), name="entrytech_entry_tech_uniq"
+            ),
+        ),
+        migrations.RunPython(tag_existing_entries, migrations.RunPython.noop),
+    ]
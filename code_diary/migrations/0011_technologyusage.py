@@ -0,0 +1,94 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:22
+
+from collections import Counter
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_usage(apps, schema_editor):
+    """Roll up the technology usage of the existing entries, streaming their tags."""
+    EntryTechnology = apps.get_model("code_diary", "EntryTechnology")
+    TechnologyUsage = apps.get_model("code_diary", "TechnologyUsage")
+    counts = Counter()
+    tags = EntryTechnology.objects.order_by().values_list(
+        "entry__user_id", "entry__date", "technology_id"
+    )
+    for user_id, day, technology_id in tags.iterator(chunk_size=2000):
+        week_start = day - timedelta(days=day.weekday())
+        counts[user_id, "week", week_start, technology_id] += 1
+        counts[user_id, "month", day.replace(day=1), technology_id] += 1
+    TechnologyUsage.objects.bulk_create(
+        [
+            TechnologyUsage(
+                user_id=user_id,
+                period=period,
+                period_start=period_start,
+                technology_id=technology_id,
+                entry_count=count,
+            )
+            for (user_id, period, period_start, technology_id), count in counts.items()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("code_diary", "0010_technology_tags"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TechnologyUsage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "period",
+                    models.CharField(
+                        choices=[("week", "Week"), ("month", "Month")], max_length=5
+                    ),
+                ),
+                ("period_start", models.DateField()),
+                ("entry_count", models.PositiveIntegerField(default=0)),
+                (
+                    "technology",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="code_diary.technology",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="technology_usage",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Technology Usage",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user", "period", "period_start", "technology"),
+                        name="techusage_user_period_uniq",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(populate_usage, migrations.RunPython.noop),
+    ]
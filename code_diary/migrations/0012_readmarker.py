@@ -0,0 +1,169 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:52
+
+import datetime
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+BATCH_SIZE = 500
+# Entries older than this no longer show as new, so marks skip them read or not
+NEW_ENTRY_WINDOW = datetime.timedelta(days=1)
+
+
+def compact_read_entries(apps, schema_editor):
+    """Replace the ReadEntry rows of every (reader, author) pair with a read marker.
+
+    The mark is set to the last entry of the longest run of entries that were read or are older
+    than NEW_ENTRY_WINDOW, oldest first; entries read past it become exceptions. Pairs are
+    processed one at a time, so memory stays flat.
+    """
+    ReadEntry = apps.get_model("code_diary", "ReadEntry")
+    ReadMarker = apps.get_model("code_diary", "ReadMarker")
+    DiaryEntry = apps.get_model("code_diary", "DiaryEntry")
+    ReadException = ReadMarker.exceptions.through
+    window_start = timezone.now() - NEW_ENTRY_WINDOW
+
+    pairs = (
+        ReadEntry.objects.order_by().values_list("user_id", "entry__user_id").distinct()
+    )
+    for reader_id, author_id in pairs.iterator():
+        if reader_id == author_id:
+            continue
+        read_ids = set(
+            ReadEntry.objects.filter(
+                user_id=reader_id, entry__user_id=author_id
+            ).values_list("entry_id", flat=True)
+        )
+        read_up_to = None
+        in_order = []
+        entries = (
+            DiaryEntry.objects.filter(user_id=author_id)
+            .order_by("created_at", "id")
+            .values_list("id", "created_at")
+        )
+        for entry_id, created_at in entries.iterator(chunk_size=BATCH_SIZE):
+            if entry_id not in read_ids and created_at > window_start:
+                # Read entries created at the same time as an unread one stay exceptions
+                while in_order and in_order[-1][1] == created_at:
+                    in_order.pop()
+                break
+            in_order.append((entry_id, created_at))
+        if in_order:
+            read_up_to = in_order[-1][1]
+        marker = ReadMarker.objects.create(
+            reader_id=reader_id, author_id=author_id, read_up_to=read_up_to
+        )
+        exception_ids = sorted(
+            read_ids.difference(entry_id for entry_id, _ in in_order)
+        )
+        for start in range(0, len(exception_ids), BATCH_SIZE):
+            ReadException.objects.bulk_create(
+                [
+                    ReadException(readmarker_id=marker.pk, diaryentry_id=entry_id)
+                    for entry_id in exception_ids[start : start + BATCH_SIZE]
+                ]
+            )
+
+
+def expand_read_markers(apps, schema_editor):
+    """Write a ReadEntry row for every entry a read marker counts as read.
+
+    Entries the marks skipped unread because they were older than NEW_ENTRY_WINDOW come back read.
+    """
+    ReadEntry = apps.get_model("code_diary", "ReadEntry")
+    ReadMarker = apps.get_model("code_diary", "ReadMarker")
+    DiaryEntry = apps.get_model("code_diary", "DiaryEntry")
+
+    for marker in ReadMarker.objects.order_by().iterator():
+        read = models.Q(read_markers=marker)
+        if marker.read_up_to is not None:
+            read |= models.Q(
+                user_id=marker.author_id, created_at__lte=marker.read_up_to
+            )
+        entry_ids = (
+            DiaryEntry.objects.filter(read)
+            .order_by()
+            .values_list("id", flat=True)
+            .distinct()
+        )
+        batch = []
+        for entry_id in entry_ids.iterator(chunk_size=BATCH_SIZE):
+            batch.append(ReadEntry(user_id=marker.reader_id, entry_id=entry_id))
+            if len(batch) >= BATCH_SIZE:
+                ReadEntry.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        ReadEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("code_diary", "0011_technologyusage"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReadMarker",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "read_up_to",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="Creation time of the last entry read in order",
+                        null=True,
+                    ),
+                ),
+                (
+                    "author",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "exceptions",
+                    models.ManyToManyField(
+                        blank=True,
+                        help_text="Entries past the mark that were read",
+                        related_name="read_markers",
+                        to="code_diary.diaryentry",
+                    ),
+                ),
+                (
+                    "reader",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="read_markers",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="readmarker",
+            constraint=models.UniqueConstraint(
+                fields=("reader", "author"), name="readmarker_reader_author_uniq"
+            ),
+        ),
+        migrations.RunPython(compact_read_entries, expand_read_markers),
+        migrations.RemoveField(
+            model_name="diaryentry",
+            name="readers",
+        ),
+        migrations.DeleteModel(
+            name="ReadEntry",
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:11
+
+from django.db import migrations, models
+
+from code_diary.rendering import make_excerpt, render_markdown
+
+BATCH_SIZE = 500
+
+
+def render_existing_entries(apps, schema_editor):
+    """Render the content and excerpt of the existing entries, streamed in batches."""
+    DiaryEntry = apps.get_model("code_diary", "DiaryEntry")
+    batch = []
+    entries = DiaryEntry.objects.order_by().only("id", "content")
+    for entry in entries.iterator(chunk_size=BATCH_SIZE):
+        entry.content_html = render_markdown(entry.content)
+        entry.excerpt = make_excerpt(entry.content)
+        batch.append(entry)
+        if len(batch) >= BATCH_SIZE:
+            DiaryEntry.objects.bulk_update(batch, ["content_html", "excerpt"])
+            batch = []
+    DiaryEntry.objects.bulk_update(batch, ["content_html", "excerpt"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("code_diary", "0012_readmarker"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="diaryentry",
+            name="content_html",
+            field=models.TextField(
+                default="",
+                editable=False,
+                help_text="Content rendered from Markdown on save",
+            ),
+        ),
+        migrations.AddField(
+            model_name="diaryentry",
+            name="excerpt",
+            field=models.CharField(
+                default="",
+                editable=False,
+                help_text="Plain text start of the content",
+                max_length=300,
+            ),
+        ),
+        migrations.RunPython(render_existing_entries, migrations.RunPython.noop),
+    ]
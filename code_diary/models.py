@@ -1,25 +1,202 @@
-from django.db import models
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections, models, router, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.constants import OnConflict
+from django.db.models.functions import Coalesce, Greatest
 from django.utils import timezone
+from django.utils.functional import cached_property
 from django.contrib.auth.models import User
 from django.urls import reverse
-from django.db.models.signals import post_save
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
 from django.dispatch import receiver
 
+from .receipts import get_read_receipts
+from .rendering import EXCERPT_MAX_LENGTH, make_excerpt, render_markdown
+
+# Entries from followed users newer than this are announced in the notification banner
+NEW_ENTRY_WINDOW = timezone.timedelta(days=1)
+
+# Number of an author's latest entries copied into a follower's inbox when they follow
+FEED_BACKFILL_SIZE = 20
+
+
+def get_follower_ids(user_id):
+    """Return a queryset of the ids of the users following the given user."""
+    return UserProfile.following.through.objects.filter(
+        user_id=user_id
+    ).values_list('userprofile__user_id', flat=True)
+
+
+def annotate_user_stats(queryset, latest_entry=False):
+    """Annotate a User queryset with entry and follower counts, and optionally the latest entry.
+
+    Counts come from the denormalized profile counters and the latest entry from correlated
+    subqueries, so a page of users renders without per-row queries.
+    """
+    queryset = queryset.annotate(
+        entry_count=F('profile__entry_count'),
+        follower_count=F('profile__follower_count'),
+    )
+    if latest_entry:
+        latest = DiaryEntry.objects.filter(user=OuterRef('pk')).order_by('-date', '-id')
+        queryset = queryset.annotate(
+            latest_entry_id=Subquery(latest.values('id')[:1]),
+            latest_entry_title=Subquery(latest.values('title')[:1]),
+            latest_entry_date=Subquery(latest.values('date')[:1]),
+        )
+    return queryset
+
+
+def recount_profile_counters(profiles=None):
+    """Recompute the denormalized counters of the given profiles (all by default) in bulk.
+
+    Returns the number of profiles whose counters had drifted and were repaired.
+    """
+    def count_of(related, field='user'):
+        return Coalesce(
+            Subquery(
+                related.filter(**{field: OuterRef('user_id')}).order_by().values(field).annotate(
+                    n=Count('*')
+                ).values('n'),
+                output_field=IntegerField()
+            ),
+            0
+        )
+
+    follows = UserProfile.following.through.objects
+    profiles = (profiles if profiles is not None else UserProfile.objects.all()).annotate(
+        actual_entry_count=count_of(DiaryEntry.objects),
+        actual_follower_count=count_of(follows),
+        actual_following_count=count_of(follows, 'userprofile__user'),
+    )
+    drifted = profiles.exclude(
+        entry_count=F('actual_entry_count'),
+        follower_count=F('actual_follower_count'),
+        following_count=F('actual_following_count'),
+    )
+    return UserProfile.objects.filter(pk__in=drifted.values('pk')).update(
+        entry_count=count_of(DiaryEntry.objects),
+        follower_count=count_of(follows),
+        following_count=count_of(follows, 'userprofile__user'),
+    )
+
+
+def get_usage_periods(day):
+    """Return the (period, period_start) rollups an entry dated `day` counts towards: its week and month."""
+    day = DiaryEntry._meta.get_field('date').to_python(day)
+    return [
+        (TechnologyUsage.WEEK, day - timezone.timedelta(days=day.weekday())),
+        (TechnologyUsage.MONTH, day.replace(day=1)),
+    ]
+
+
+def rebuild_technology_usage(users=None):
+    """Recompute the technology usage rollups of the given users (all by default) from their tags.
+
+    The tags are streamed, so memory grows with the number of rollup rows rather than entries.
+    Returns the number of rollup rows written.
+    """
+    tags = EntryTechnology.objects.order_by()
+    rollups = TechnologyUsage.objects.all()
+    if users is not None:
+        tags = tags.filter(entry__user__in=users)
+        rollups = rollups.filter(user__in=users)
+
+    counts = Counter()
+    for user_id, day, technology_id in tags.values_list(
+        'entry__user_id', 'entry__date', 'technology_id'
+    ).iterator(chunk_size=2000):
+        for period, period_start in get_usage_periods(day):
+            counts[user_id, period, period_start, technology_id] += 1
+
+    with transaction.atomic():
+        rollups.delete()
+        TechnologyUsage.objects.bulk_create([
+            TechnologyUsage(
+                user_id=user_id, period=period, period_start=period_start,
+                technology_id=technology_id, entry_count=count,
+            )
+            for (user_id, period, period_start, technology_id), count in counts.items()
+        ], batch_size=500)
+    return len(counts)
+
+
+def get_feed_fanout_limit():
+    """Authors with more followers than this are fanned out on read instead of on write."""
+    return getattr(settings, 'CODE_DIARY_FEED_FANOUT_LIMIT', 1000)
+
+
+def parse_technologies(text):
+    """Split a technologies string into distinct names, separated by commas and/or whitespace.
+
+    Duplicates are dropped case-insensitively, keeping the first spelling and the original order.
+    """
+    names = {}
+    for name in re.split(r'[,\s]+', text or ''):
+        if name:
+            names.setdefault(name.lower(), name[:Technology._meta.get_field('name').max_length])
+    return list(names.values())
+
+
+
 # Create your models here.
+class Technology(models.Model):
+    """A technology diary entries are tagged with, parsed from their technologies string."""
+    name = models.CharField(max_length=50)
+    # Lower-cased name identifying the technology case-insensitively, also used in URLs
+    key = models.CharField(max_length=50, unique=True)
+
+    class Meta:
+        verbose_name_plural = "Technologies"
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        self.key = self.name.lower()
+        super().save(*args, **kwargs)
+
+    def get_absolute_url(self):
+        return reverse('code_diary:technology_entries', kwargs={'key': self.key})
+
+    @classmethod
+    def get_or_create_many(cls, names):
+        """Return the technologies with the given names, creating the missing ones in one query."""
+        if not names:
+            return []
+        cls.objects.bulk_create([cls(name=name, key=name.lower()) for name in names], ignore_conflicts=True)
+        return list(cls.objects.filter(key__in=[name.lower() for name in names]))
+
+
 class DiaryEntry(models.Model):
     """Model for storing daily code diary entries."""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='diary_entries')
     date = models.DateField(default=timezone.now)
     title = models.CharField(max_length=200)
     content = models.TextField(help_text="Describe what you coded today")
+    content_html = models.TextField(default='', editable=False, help_text="Content rendered from Markdown on save")
+    excerpt = models.CharField(
+        max_length=EXCERPT_MAX_LENGTH, default='', editable=False, help_text="Plain text start of the content"
+    )
     technologies = models.CharField(max_length=200, help_text="Technologies used (comma separated)")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    readers = models.ManyToManyField(User, through='ReadEntry', related_name='read_entries')
+    tags = models.ManyToManyField(Technology, through='EntryTechnology', related_name='entries', blank=True)
 
     class Meta:
         ordering = ['-date']
         verbose_name_plural = "Diary Entries"
+        indexes = [
+            # A user's entries, newest first (my entries, user profile pages)
+            models.Index(fields=['user', '-date', '-id'], name='entry_user_date_idx'),
+            # Entries of followed users created after a point in time (feed, notifications)
+            models.Index(fields=['user', 'created_at'], name='entry_user_created_idx'),
+            # Latest entries from all users (home page)
+            models.Index(fields=['-date', '-created_at'], name='entry_date_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.date}: {self.title}"
@@ -27,25 +204,485 @@ class DiaryEntry(models.Model):
     def get_absolute_url(self):
         return reverse('code_diary:entry_detail', kwargs={'pk': self.pk})
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            if 'content' in update_fields:
+                self.render_content()
+                kwargs['update_fields'] = {*update_fields, 'content_html', 'excerpt'}
+        elif 'content' not in self.get_deferred_fields():
+            # Saving an instance with deferred content only writes its loaded fields, so the rendering is kept
+            self.render_content()
+        super().save(*args, **kwargs)
 
-class ReadEntry(models.Model):
-    """Model for tracking which entries a user has read."""
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    def render_content(self):
+        """Render the Markdown content and its excerpt once, so pages showing the entry do not have to."""
+        self.content_html = render_markdown(self.content)
+        self.excerpt = make_excerpt(self.content)
+
+    @property
+    def readers(self):
+        """Users who have read the entry, according to their read markers.
+
+        Once the entry is older than `NEW_ENTRY_WINDOW`, this includes the followers whose marks skipped it unread.
+        """
+        return User.objects.filter(
+            models.Q(read_markers__author_id=self.user_id, read_markers__read_up_to__gte=self.created_at)
+            | models.Q(read_markers__exceptions=self)
+        ).distinct()
+
+    def sync_tags(self):
+        """Make the entry's tags match its technologies string and return the technologies."""
+        technologies = Technology.get_or_create_many(parse_technologies(self.technologies))
+        self.tags.set(technologies)
+        return technologies
+
+
+def bulk_tag_entries(entries):
+    """Tag entries inserted with bulk_create(), which skips the post_save signal that normally does it."""
+    names_by_entry = {entry.pk: parse_technologies(entry.technologies) for entry in entries}
+    names = {name.lower(): name for entry_names in names_by_entry.values() for name in entry_names}
+    technology_ids = {
+        technology.key: technology.pk for technology in Technology.get_or_create_many(list(names.values()))
+    }
+    EntryTechnology.objects.bulk_create([
+        EntryTechnology(entry_id=entry_id, technology_id=technology_ids[name.lower()])
+        for entry_id, entry_names in names_by_entry.items()
+        for name in entry_names
+    ], ignore_conflicts=True)
+
+
+def bulk_deliver_entries(entries):
+    """Fan entries inserted with bulk_create() out to their authors' followers, as the post_save signals do.
+
+    Followers get an unread entry for each of them, and an inbox item unless the author fans out on read.
+    """
+    follower_ids = {}
+    for author_id, follower_id in UserProfile.following.through.objects.filter(
+        user_id__in={entry.user_id for entry in entries}
+    ).values_list('user_id', 'userprofile__user_id'):
+        follower_ids.setdefault(author_id, []).append(follower_id)
+    if not follower_ids:
+        return
+    read_author_ids = set(UserProfile.objects.filter(
+        user_id__in=follower_ids, fan_out_on_read=True
+    ).values_list('user_id', flat=True))
+    deliveries = [
+        (follower_id, entry) for entry in entries for follower_id in follower_ids.get(entry.user_id, ())
+    ]
+    UnreadEntry.objects.bulk_create([
+        UnreadEntry(user_id=follower_id, entry=entry, author_id=entry.user_id, created_at=entry.created_at)
+        for follower_id, entry in deliveries
+    ], ignore_conflicts=True)
+    InboxItem.objects.bulk_create([
+        InboxItem(owner_id=follower_id, entry=entry, author_id=entry.user_id, created_at=entry.created_at)
+        for follower_id, entry in deliveries
+        if entry.user_id not in read_author_ids
+    ], ignore_conflicts=True)
+
+
+class EntryTechnology(models.Model):
+    """Tag linking a diary entry to one of its technologies."""
     entry = models.ForeignKey(DiaryEntry, on_delete=models.CASCADE)
-    read_at = models.DateTimeField(auto_now_add=True)
+    technology = models.ForeignKey(Technology, on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            # Also serves prefetching the tags of a page of entries
+            models.UniqueConstraint(fields=['entry', 'technology'], name='entrytech_entry_tech_uniq'),
+        ]
+        indexes = [
+            # Entries tagged with a technology (tag listings, admin filter)
+            models.Index(fields=['technology', 'entry'], name='entrytech_tech_entry_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.entry_id} - {self.technology_id}"
+
+
+class TechnologyUsage(models.Model):
+    """Rollup of how many of a user's entries used a technology in a week or month.
+
+    Kept up to date incrementally by signals as entries are saved and deleted, so the stats
+    dashboard never has to scan the entries. rebuild_technology_usage() recomputes it from scratch.
+    """
+    WEEK = 'week'
+    MONTH = 'month'
+    PERIOD_CHOICES = [(WEEK, 'Week'), (MONTH, 'Month')]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='technology_usage')
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    # Monday of the week or first day of the month
+    period_start = models.DateField()
+    technology = models.ForeignKey(Technology, on_delete=models.CASCADE, related_name='+')
+    entry_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Also serves the dashboard's (user, period, period_start) range scans
+            models.UniqueConstraint(
+                fields=['user', 'period', 'period_start', 'technology'], name='techusage_user_period_uniq'
+            ),
+        ]
+        verbose_name_plural = "Technology Usage"
+
+    def __str__(self):
+        return f"{self.user_id} {self.period} {self.period_start}: {self.technology_id} x{self.entry_count}"
+
+    @classmethod
+    def recent_period_starts(cls, period, count, today=None):
+        """Return the starts of the last `count` periods up to the one containing `today`, oldest first."""
+        week_start, month_start = (start for _, start in get_usage_periods(today or timezone.localdate()))
+        if period == cls.WEEK:
+            return [week_start - timezone.timedelta(weeks=n) for n in reversed(range(count))]
+        starts = [month_start]
+        while len(starts) < count:
+            starts.append((starts[-1] - timezone.timedelta(days=1)).replace(day=1))
+        return starts[::-1]
+
+    @classmethod
+    def get_entry_state(cls, entry_id):
+        """Return the (user_id, date, technology_ids) a saved entry currently counts towards, or None."""
+        entry = DiaryEntry.objects.filter(pk=entry_id).values_list('user_id', 'date').first()
+        if entry is None:
+            return None
+        technology_ids = EntryTechnology.objects.filter(entry_id=entry_id).values_list('technology_id', flat=True)
+        return entry[0], entry[1], sorted(technology_ids)
+
+    @classmethod
+    def update_for_entry(cls, before, after):
+        """Move an entry's contribution from the `before` to the `after` state (see get_entry_state()).
+
+        Either state may be None for created and deleted entries. Only the rollups that actually
+        change are written, so edits that keep the date and technologies cost nothing.
+        """
+        deltas = Counter()
+        for state, delta in ((before, -1), (after, 1)):
+            if state is not None:
+                user_id, day, technology_ids = state
+                for period, period_start in get_usage_periods(day):
+                    for technology_id in technology_ids:
+                        deltas[user_id, period, period_start, technology_id] += delta
+        added = [key for key, delta in deltas.items() if delta > 0]
+        removed = [key for key, delta in deltas.items() if delta < 0]
+
+        if added:
+            cls.objects.bulk_create([
+                cls(user_id=user_id, period=period, period_start=period_start, technology_id=technology_id)
+                for user_id, period, period_start, technology_id in added
+            ], ignore_conflicts=True)
+            cls._rollups(added).update(entry_count=F('entry_count') + 1)
+        if removed:
+            rollups = cls._rollups(removed)
+            rollups.update(entry_count=Greatest(F('entry_count') - 1, 0))
+            rollups.filter(entry_count=0).delete()
+
+    @classmethod
+    def _rollups(cls, keys):
+        condition = models.Q()
+        for user_id, period, period_start, technology_id in keys:
+            condition |= models.Q(
+                user_id=user_id, period=period, period_start=period_start, technology_id=technology_id
+            )
+        return cls.objects.filter(condition)
+
+
+class ReadMarker(models.Model):
+    """High-water mark of the entries of one author a reader has read.
+
+    Every entry the author created up to `read_up_to` counts as read. Entries read out of order,
+    past the mark, are kept in `exceptions` until the mark can move past them, which it does over
+    unread entries once they are older than `NEW_ENTRY_WINDOW`. This stores one row per (reader,
+    author) pair plus the entries read out of order in the last day, instead of one per entry read.
+    """
+    reader = models.ForeignKey(User, on_delete=models.CASCADE, related_name='read_markers')
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    read_up_to = models.DateTimeField(
+        null=True, blank=True, help_text="Creation time of the last entry read in order"
+    )
+    exceptions = models.ManyToManyField(
+        DiaryEntry, blank=True, related_name='read_markers', help_text="Entries past the mark that were read"
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['reader', 'author'], name='readmarker_reader_author_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.reader.username} read {self.author.username}'s entries up to {self.read_up_to}"
+
+    def advance(self, window_start=None):
+        """Move the mark past the exceptions that directly follow it, and drop them.
+
+        Entries older than `NEW_ENTRY_WINDOW` no longer show as new, so the mark skips them
+        whether they were read or not, and an entry left unread only holds it back for a day.
+        """
+        exceptions = dict(self.exceptions.values_list('pk', 'created_at'))
+        if not exceptions:
+            return
+        window_start = window_start or timezone.now() - NEW_ENTRY_WINDOW
+        start = self.start(window_start)
+        passed = []
+        for entry_id, created_at in DiaryEntry.objects.filter(
+            user_id=self.author_id, created_at__gt=start
+        ).order_by('created_at', 'id').values_list('pk', 'created_at')[:len(exceptions) + 1]:
+            if entry_id not in exceptions:
+                # Read entries created at the same time as an unread one must stay exceptions
+                while passed and passed[-1][1] == created_at:
+                    passed.pop()
+                break
+            passed.append((entry_id, created_at))
+        if passed:
+            self.read_up_to = passed[-1][1]
+            self.save(update_fields=['read_up_to'])
+        start = self.start(window_start)
+        passed_ids = [entry_id for entry_id, created_at in exceptions.items() if created_at <= start]
+        if passed_ids:
+            self.exceptions.remove(*passed_ids)
+
+    def start(self, window_start):
+        """Return the creation time up to which the author's entries count as read."""
+        if self.read_up_to is None or self.read_up_to < window_start:
+            return window_start
+        return self.read_up_to
+
+    @classmethod
+    def record_read(cls, reader, entry):
+        """Record that `reader` has read `entry`."""
+        cls.record_receipts({reader.pk: {entry.pk}})
+
+    @classmethod
+    def record_receipts(cls, receipts):
+        """Write buffered read receipts, a mapping of user ids to sets of entry ids, in one batch.
+
+        Entries read past a marker and within `NEW_ENTRY_WINDOW` become exceptions and the markers are
+        advanced over them.
+        Receipts for entries deleted in the meantime or written by the reader are skipped, and the
+        unread state of the entries is cleared in the same transaction.
+        """
+        entries = {
+            entry_id: (author_id, created_at)
+            for entry_id, author_id, created_at in DiaryEntry.objects.filter(
+                pk__in=set().union(*receipts.values())
+            ).values_list('pk', 'user_id', 'created_at')
+        }
+        reads = {}
+        for reader_id, entry_ids in receipts.items():
+            for entry_id in entry_ids:
+                if entry_id in entries and entries[entry_id][0] != reader_id:
+                    reads.setdefault((reader_id, entries[entry_id][0]), []).append(entry_id)
+        if not reads:
+            return
+
+        with transaction.atomic():
+            cls.objects.bulk_create(
+                [cls(reader_id=reader_id, author_id=author_id) for reader_id, author_id in reads],
+                ignore_conflicts=True,
+            )
+            pairs = models.Q()
+            unread = models.Q()
+            for reader_id, author_id in reads:
+                pairs |= models.Q(reader_id=reader_id, author_id=author_id)
+            markers = list(cls.objects.filter(pairs))
+            window_start = timezone.now() - NEW_ENTRY_WINDOW
+            exceptions = []
+            for marker in markers:
+                entry_ids = reads[marker.reader_id, marker.author_id]
+                unread |= models.Q(user_id=marker.reader_id, entry_id__in=entry_ids)
+                exceptions.extend(
+                    cls.exceptions.through(readmarker_id=marker.pk, diaryentry_id=entry_id)
+                    for entry_id in entry_ids
+                    if entries[entry_id][1] > marker.start(window_start)
+                )
+            cls.exceptions.through.objects.bulk_create(exceptions, ignore_conflicts=True)
+            for marker in markers:
+                marker.advance(window_start)
+            UnreadEntry.objects.filter(unread).delete()
+
+    @classmethod
+    def mark_read(cls, reader, authors):
+        """Mark every entry of the given authors as read by `reader` with set-based writes.
+
+        The markers are moved to the authors' latest entries by a single INSERT ... SELECT that
+        updates existing markers, their exceptions are dropped, and the unread state behind the
+        notification banner is cleared in the same transaction. Returns the number of authors whose
+        entries were marked as read.
+        """
+        using = router.db_for_write(cls)
+        connection = connections[using]
+        qn = connection.ops.quote_name
+        fields = [cls._meta.get_field(name) for name in ('reader', 'author', 'read_up_to')]
+        author_column = DiaryEntry._meta.get_field('user').attname
+        latest = DiaryEntry.objects.filter(user__in=authors).exclude(user=reader).order_by().values(
+            author_column
+        ).annotate(latest=models.Max('created_at'))
+        select_sql, select_params = latest.query.sql_with_params()
+        sql = (
+            f"{connection.ops.insert_statement(on_conflict=OnConflict.UPDATE)} {qn(cls._meta.db_table)} "
+            f"({', '.join(qn(field.column) for field in fields)}) "
+            # WHERE disambiguates the following ON CONFLICT clause from a join constraint for SQLite's parser
+            f"SELECT %s, latest.{qn(author_column)}, latest.{qn('latest')} FROM ({select_sql}) latest WHERE 1 = 1 "
+            + connection.ops.on_conflict_suffix_sql(
+                fields, OnConflict.UPDATE, [fields[2].column], [fields[0].column, fields[1].column]
+            )
+        )
+        with transaction.atomic(using=using):
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [reader.pk, *select_params])
+                marked = cursor.rowcount
+            cls.exceptions.through.objects.using(using).filter(
+                readmarker__reader=reader, readmarker__author__in=authors
+            ).delete()
+            UnreadEntry.objects.using(using).filter(user=reader, author__in=authors).delete()
+        return marked
+
+    @classmethod
+    def unread_entries(cls, reader, author_ids, since):
+        """Return the entries the given authors created after `since` that `reader` has not read, unordered.
+
+        Each author contributes one range of the (user, created_at) index, starting at the later
+        of `since` and the reader's mark for that author.
+        """
+        read_up_to = dict(
+            cls.objects.filter(reader=reader, author_id__in=author_ids).values_list('author_id', 'read_up_to')
+        )
+        ranges = models.Q()
+        for author_id in author_ids:
+            start = read_up_to.get(author_id)
+            ranges |= models.Q(user_id=author_id, created_at__gt=max(since, start) if start else since)
+        if not ranges:
+            return DiaryEntry.objects.none()
+        return DiaryEntry.objects.order_by().filter(ranges).exclude(
+            pk__in=cls.exceptions.through.objects.filter(
+                readmarker__reader=reader, readmarker__author_id__in=author_ids
+            ).values('diaryentry_id')
+        )
+
+
+class UnreadEntry(models.Model):
+    """Denormalized unread state: one row per follower for each entry they have not read yet.
+
+    Rows are maintained on entry creation, reading and following, so that
+    the notification banner can be answered with a single indexed lookup.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='unread_entries')
+    entry = models.ForeignKey(DiaryEntry, on_delete=models.CASCADE, related_name='unread_by')
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField(help_text="Copy of the entry's creation time")
 
     class Meta:
         unique_together = ('user', 'entry')
-        verbose_name_plural = "Read Entries"
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='unread_user_created_idx'),
+        ]
+        verbose_name_plural = "Unread Entries"
+
+    def __str__(self):
+        return f"{self.user.username} has not read {self.entry.title}"
+
+    @classmethod
+    def get_unread(cls, user):
+        """Unread rows of the user created within the window, minus entries whose read receipts are still buffered."""
+        unread = cls.objects.filter(
+            user=user,
+            created_at__gt=timezone.now() - NEW_ENTRY_WINDOW
+        )
+        pending = get_read_receipts().pending(user.pk)
+        if pending:
+            unread = unread.exclude(entry_id__in=pending)
+        return unread
+
+    @classmethod
+    def has_unread(cls, user):
+        """Check if the user has unread entries from followed users created within the window."""
+        return cls.get_unread(user).exists()
+
+    @classmethod
+    async def ahas_unread(cls, user):
+        """Async version of has_unread()."""
+        return await cls.get_unread(user).aexists()
+
+    @classmethod
+    def prune(cls):
+        """Delete the rows of entries older than the window, which the banner no longer shows.
+
+        Rows only go away on their own when the entry is read or deleted or its author unfollowed,
+        so this is run on a schedule by the prune_unread_entries command. Returns the number of rows deleted.
+        """
+        return cls.objects.filter(created_at__lte=timezone.now() - NEW_ENTRY_WINDOW).delete()[0]
+
+    @classmethod
+    def add_for_followers(cls, entry):
+        """Mark a new entry as unread for everyone following its author."""
+        follower_ids = get_follower_ids(entry.user_id)
+        cls.objects.bulk_create([
+            cls(user_id=follower_id, entry=entry, author_id=entry.user_id, created_at=entry.created_at)
+            for follower_id in follower_ids
+        ], ignore_conflicts=True)
+
+    @classmethod
+    def add_for_follow(cls, user, author_ids):
+        """Mark the recent, not yet read entries of newly followed authors as unread."""
+        recent_entries = ReadMarker.unread_entries(
+            user, author_ids, timezone.now() - NEW_ENTRY_WINDOW
+        ).values_list('id', 'user_id', 'created_at')
+        cls.objects.bulk_create([
+            cls(user=user, entry_id=entry_id, author_id=author_id, created_at=created_at)
+            for entry_id, author_id, created_at in recent_entries
+        ], ignore_conflicts=True)
+
+
+class InboxItem(models.Model):
+    """Fan-out-on-write feed: one row per follower for each entry of an author they follow."""
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='inbox_items')
+    entry = models.ForeignKey(DiaryEntry, on_delete=models.CASCADE, related_name='inbox_items')
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField(help_text="Copy of the entry's creation time")
+
+    class Meta:
+        unique_together = ('owner', 'entry')
+        indexes = [
+            models.Index(fields=['owner', '-created_at', '-entry'], name='inbox_owner_created_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.user.username} read {self.entry.title} on {self.read_at}"
+        return f"{self.entry.title} in {self.owner.username}'s inbox"
+
+    @classmethod
+    def add_for_followers(cls, entry):
+        """Deliver a new entry to the inbox of everyone following its author."""
+        follower_ids = get_follower_ids(entry.user_id)
+        cls.objects.bulk_create([
+            cls(owner_id=follower_id, entry=entry, author_id=entry.user_id, created_at=entry.created_at)
+            for follower_id in follower_ids
+        ], ignore_conflicts=True)
+
+    @classmethod
+    def backfill(cls, owner_ids, author_id):
+        """Copy the latest entries of an author into the inboxes of the given users."""
+        latest_entries = DiaryEntry.objects.filter(user_id=author_id).order_by(
+            '-created_at', '-id'
+        ).values_list('id', 'created_at')[:FEED_BACKFILL_SIZE]
+        cls.objects.bulk_create([
+            cls(owner_id=owner_id, entry_id=entry_id, author_id=author_id, created_at=created_at)
+            for owner_id in owner_ids
+            for entry_id, created_at in latest_entries
+        ], ignore_conflicts=True)
 
 
 class UserProfile(models.Model):
     """Model for storing user profile information and following relationships."""
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     following = models.ManyToManyField(User, related_name='followers', blank=True)
+    fan_out_on_read = models.BooleanField(
+        default=False,
+        help_text="Followers read this user's entries directly instead of through their inbox"
+    )
+    # Denormalized counters, kept current by signals and repaired by the recount_profile_counters command
+    entry_count = models.PositiveIntegerField(default=0)
+    follower_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return f"{self.user.username}'s profile"
@@ -54,6 +691,7 @@ class UserProfile(models.Model):
         """Follow a user if not already following."""
         if user != self.user and not self.following.filter(id=user.id).exists():
             self.following.add(user)
+            self.__dict__.pop('following_ids', None)
             return True
         return False
 
@@ -61,12 +699,36 @@ class UserProfile(models.Model):
         """Unfollow a user if currently following."""
         if self.following.filter(id=user.id).exists():
             self.following.remove(user)
+            self.__dict__.pop('following_ids', None)
             return True
         return False
 
+    async def afollow(self, user):
+        """Async version of follow()."""
+        if user.pk != self.user_id and not await self.following.filter(id=user.id).aexists():
+            await self.following.aadd(user)
+            self.__dict__.pop('following_ids', None)
+            return True
+        return False
+
+    async def aunfollow(self, user):
+        """Async version of unfollow()."""
+        if await self.following.filter(id=user.id).aexists():
+            await self.following.aremove(user)
+            self.__dict__.pop('following_ids', None)
+            return True
+        return False
+
+    @cached_property
+    def following_ids(self):
+        """Ids of the users this user is following, loaded once per profile instance."""
+        return frozenset(
+            UserProfile.following.through.objects.filter(userprofile=self).values_list('user_id', flat=True)
+        )
+
     def is_following(self, user):
         """Check if following a specific user."""
-        return self.following.filter(id=user.id).exists()
+        return user.pk in self.following_ids
 
     def get_following(self):
         """Get all users that this user is following."""
@@ -76,6 +738,17 @@ class UserProfile(models.Model):
         """Get all users that follow this user."""
         return User.objects.filter(profile__following=self.user)
 
+    def update_fan_out_mode(self):
+        """Switch between fan-out on write and on read depending on the denormalized follower count."""
+        fan_out_on_read = self.follower_count > get_feed_fanout_limit()
+        if fan_out_on_read == self.fan_out_on_read:
+            return
+        self.fan_out_on_read = fan_out_on_read
+        self.save(update_fields=['fan_out_on_read'])
+        if not fan_out_on_read:
+            # Entries written while fanning out on read never reached the inboxes
+            InboxItem.backfill(self.get_followers().values_list('id', flat=True), self.user_id)
+
 
 # Signal to create a UserProfile when a new User is created
 @receiver(post_save, sender=User)
@@ -92,3 +765,186 @@ def save_user_profile(sender, instance, **kwargs):
     else:
         # Create profile if it doesn't exist (for existing users)
         UserProfile.objects.create(user=instance)
+
+
+# Signals keeping the denormalized unread state in sync
+@receiver(post_save, sender=DiaryEntry)
+def add_unread_entries(sender, instance, created, **kwargs):
+    """Notify followers of a newly created entry."""
+    if created:
+        UnreadEntry.add_for_followers(instance)
+
+@receiver(m2m_changed, sender=UserProfile.following.through)
+def sync_unread_entries_on_follow(sender, instance, action, reverse, pk_set, **kwargs):
+    """Add or drop unread entries when a user follows or unfollows someone."""
+    if action == 'post_add':
+        if reverse:
+            # instance is the followed user, pk_set holds the follower profiles
+            for user_id in UserProfile.objects.filter(pk__in=pk_set).values_list('user_id', flat=True):
+                UnreadEntry.add_for_follow(User(pk=user_id), [instance.pk])
+        else:
+            UnreadEntry.add_for_follow(instance.user, pk_set)
+    elif action == 'post_remove':
+        if reverse:
+            UnreadEntry.objects.filter(
+                user__profile__in=pk_set, author=instance
+            ).delete()
+        else:
+            UnreadEntry.objects.filter(user=instance.user, author_id__in=pk_set).delete()
+    elif action == 'post_clear':
+        if reverse:
+            UnreadEntry.objects.filter(author=instance).delete()
+        else:
+            UnreadEntry.objects.filter(user=instance.user).delete()
+
+
+# Signals keeping the follower inboxes in sync
+@receiver(post_save, sender=DiaryEntry)
+def add_inbox_items(sender, instance, created, **kwargs):
+    """Fan a newly created entry out to the inboxes of the author's followers."""
+    if created and not UserProfile.objects.filter(user_id=instance.user_id, fan_out_on_read=True).exists():
+        InboxItem.add_for_followers(instance)
+
+@receiver(m2m_changed, sender=UserProfile.following.through)
+def sync_inbox_on_follow(sender, instance, action, reverse, pk_set, **kwargs):
+    """Backfill or prune inboxes when follows change."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        follower_ids = list(UserProfile.objects.filter(pk__in=pk_set or []).values_list('user_id', flat=True))
+        pairs = [(follower_id, instance.pk) for follower_id in follower_ids]
+    else:
+        pairs = [(instance.user_id, author_id) for author_id in pk_set or []]
+
+    if action == 'post_add':
+        for follower_id, author_id in pairs:
+            InboxItem.backfill([follower_id], author_id)
+    elif action == 'post_remove':
+        for follower_id, author_id in pairs:
+            InboxItem.objects.filter(owner_id=follower_id, author_id=author_id).delete()
+    elif reverse:
+        InboxItem.objects.filter(author=instance).delete()
+    else:
+        InboxItem.objects.filter(owner=instance.user).delete()
+
+
+@receiver(post_save, sender=DiaryEntry)
+def push_new_entry_notification(sender, instance, created, **kwargs):
+    """Push a notification to the followers' event streams once the entry is committed."""
+    if created:
+        from .broker import publish_new_entry
+        transaction.on_commit(lambda: publish_new_entry(instance))
+
+
+# Signals keeping the denormalized profile counters in sync
+def adjust_counter(profiles, field, delta):
+    """Atomically add delta to a counter of the given profiles, never going below zero."""
+    profiles.update(**{field: Greatest(F(field) + delta, 0)})
+
+@receiver(post_save, sender=DiaryEntry)
+def increment_entry_count(sender, instance, created, **kwargs):
+    """Count a newly created entry on its author's profile."""
+    if created:
+        adjust_counter(UserProfile.objects.filter(user_id=instance.user_id), 'entry_count', 1)
+
+@receiver(post_delete, sender=DiaryEntry)
+def decrement_entry_count(sender, instance, **kwargs):
+    """Uncount a deleted entry on its author's profile."""
+    adjust_counter(UserProfile.objects.filter(user_id=instance.user_id), 'entry_count', -1)
+
+@receiver(m2m_changed, sender=UserProfile.following.through)
+def update_follow_counters(sender, instance, action, reverse, pk_set, **kwargs):
+    """Adjust the following and follower counters when follows change."""
+    if action == 'pre_clear':
+        # post_clear doesn't receive the cleared ids, so adjust before they are gone
+        if reverse:
+            adjust_counter(UserProfile.objects.filter(following=instance), 'following_count', -1)
+            UserProfile.objects.filter(user=instance).update(follower_count=0)
+        else:
+            adjust_counter(UserProfile.objects.filter(user__followers=instance), 'follower_count', -1)
+            UserProfile.objects.filter(pk=instance.pk).update(following_count=0)
+        return
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+
+    delta = 1 if action == 'post_add' else -1
+    if reverse:
+        # instance is the followed user, pk_set holds the follower profiles
+        adjust_counter(UserProfile.objects.filter(user=instance), 'follower_count', delta * len(pk_set))
+        adjust_counter(UserProfile.objects.filter(pk__in=pk_set), 'following_count', delta)
+    else:
+        adjust_counter(UserProfile.objects.filter(pk=instance.pk), 'following_count', delta * len(pk_set))
+        adjust_counter(UserProfile.objects.filter(user_id__in=pk_set), 'follower_count', delta)
+
+@receiver(m2m_changed, sender=UserProfile.following.through)
+def update_fan_out_modes(sender, instance, action, reverse, pk_set, **kwargs):
+    """Update the fan-out mode of the followed authors, once update_follow_counters has adjusted their counts."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    author_ids = {instance.pk} if reverse else set(pk_set or [])
+    for profile in UserProfile.objects.filter(user_id__in=author_ids):
+        profile.update_fan_out_mode()
+
+
+# Signals keeping the technology tags and usage rollups in sync with the technologies string
+@receiver(pre_save, sender=DiaryEntry)
+def remember_entry_usage(sender, instance, **kwargs):
+    """Remember what an edited entry counted towards before the edit."""
+    instance._usage_before = TechnologyUsage.get_entry_state(instance.pk) if instance.pk else None
+
+
+@receiver(post_save, sender=DiaryEntry)
+def sync_entry_tags(sender, instance, **kwargs):
+    """Re-tag an entry whenever it is saved. bulk_create() callers must call sync_tags() themselves."""
+    technologies = instance.sync_tags()
+    TechnologyUsage.update_for_entry(
+        getattr(instance, '_usage_before', None),
+        (instance.user_id, instance.date, sorted(technology.pk for technology in technologies)),
+    )
+
+
+@receiver(pre_delete, sender=DiaryEntry)
+def remove_entry_usage(sender, instance, **kwargs):
+    """Take a deleted entry out of the usage rollups while its tags still exist."""
+    TechnologyUsage.update_for_entry(TechnologyUsage.get_entry_state(instance.pk), None)
+
+
+# Signals invalidating cached renderings of the entries
+@receiver(post_save, sender=DiaryEntry)
+@receiver(post_delete, sender=DiaryEntry)
+def invalidate_entry_caches(sender, instance, **kwargs):
+    """Bump the global entries version and the author's version so cached entry lists are rendered again."""
+    from .caching import bump_entries_version
+    bump_entries_version()
+    bump_user_versions_on_commit([instance.user_id])
+
+
+def bump_user_versions_on_commit(user_ids):
+    """Bump the versions of users now, and again once the transaction commits.
+
+    The second bump drops what other requests cached from the database before the commit.
+    """
+    from .caching import bump_user_versions
+    bump_user_versions(user_ids)
+    transaction.on_commit(lambda: bump_user_versions(user_ids))
+
+
+@receiver(m2m_changed, sender=UserProfile.following.through)
+def invalidate_follow_caches(sender, instance, action, reverse, pk_set, **kwargs):
+    """Bump the versions of both sides of changed follows, whose lists and counters are cached."""
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if action == 'pre_clear':
+        # post_clear doesn't receive the cleared ids
+        if reverse:
+            pk_set = set(UserProfile.objects.filter(following=instance).values_list('pk', flat=True))
+        else:
+            pk_set = set(instance.following.values_list('pk', flat=True))
+    if not pk_set:
+        return
+    if reverse:
+        # instance is the followed user, pk_set holds the follower profiles
+        user_ids = [instance.pk, *UserProfile.objects.filter(pk__in=pk_set).values_list('user_id', flat=True)]
+    else:
+        user_ids = [instance.user_id, *pk_set]
+    bump_user_versions_on_commit(user_ids)
@@ -0,0 +1,154 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import Http404
+
+
+def encode_cursor(values):
+    """Encode the ordering values of a row into an opaque, URL-safe cursor token."""
+    payload = json.dumps(list(values), cls=DjangoJSONEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Decode a cursor token created by encode_cursor, raising ValueError if it is malformed."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError(f"Invalid cursor: {token!r}")
+    if not isinstance(values, list):
+        raise ValueError(f"Invalid cursor: {token!r}")
+    return values
+
+
+def parse_cursor_values(model, ordering, values):
+    """Convert the decoded values of a cursor with the fields of `ordering`, raising ValueError for bad ones."""
+    if len(ordering) != len(values):
+        raise ValueError("Cursor does not match the ordering")
+    try:
+        return [
+            model._meta.get_field(field.lstrip('-')).to_python(value)
+            for field, value in zip(ordering, values)
+        ]
+    except (TypeError, ValidationError) as error:
+        raise ValueError(f"Invalid cursor values: {values!r}") from error
+
+
+def keyset_filter(ordering, values):
+    """Build a Q object selecting the rows that come strictly after `values` in `ordering`.
+
+    `ordering` is a sequence of field names as passed to order_by(), e.g. ('-created_at', '-id').
+    """
+    if len(ordering) != len(values):
+        raise ValueError("Cursor does not match the ordering")
+    condition = Q()
+    for position, field in enumerate(ordering):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        step = Q(**{f'{name}__{lookup}': values[position]})
+        for previous_field, previous_value in zip(ordering[:position], values[:position]):
+            step &= Q(**{previous_field.lstrip('-'): previous_value})
+        condition |= step
+    # Bound the leading column on its own as well, so the database can seek an index on it
+    first = ordering[0]
+    bound = 'lte' if first.startswith('-') else 'gte'
+    return Q(**{f'{first.lstrip("-")}__{bound}': values[0]}) & condition
+
+
+def reverse_ordering(ordering):
+    """Flip the direction of every field in an ordering."""
+    return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in ordering)
+
+
+class CursorPage:
+    """A page of results from a CursorPaginator, with opaque tokens for its neighbours."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f"<CursorPage of {len(self.object_list)} objects>"
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Keyset paginator: pages are selected with a range on `ordering` instead of OFFSET.
+
+    It never counts the rows, and every page costs the same no matter how deep it is.
+    The last field of `ordering` must be unique (usually 'id' or '-id').
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = int(per_page)
+
+    def get_cursor_values(self, obj):
+        return [getattr(obj, field.lstrip('-')) for field in self.ordering]
+
+    def page(self, cursor=None):
+        """Return the page a cursor points to, or the first page. Raises ValueError for a bad cursor."""
+        direction, values = '>', None
+        if cursor:
+            direction, *values = decode_cursor(cursor)
+            if direction not in ('>', '<'):
+                raise ValueError(f"Invalid cursor: {cursor!r}")
+
+        ordering = self.ordering if direction == '>' else reverse_ordering(self.ordering)
+        queryset = self.queryset
+        if values is not None:
+            values = parse_cursor_values(queryset.model, self.ordering, values)
+            queryset = queryset.filter(keyset_filter(ordering, values))
+        rows = list(queryset.order_by(*ordering)[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if direction == '>':
+            has_next, has_previous = has_more, values is not None
+        else:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = encode_cursor(['>', *self.get_cursor_values(rows[-1])])
+        if rows and has_previous:
+            previous_cursor = encode_cursor(['<', *self.get_cursor_values(rows[0])])
+        return CursorPage(rows, next_cursor, previous_cursor)
+
+
+class CursorPaginationMixin:
+    """ListView mixin paginating with CursorPaginator, so pages are navigated with next/previous tokens."""
+    cursor_ordering = ('-date', '-id')
+    cursor_kwarg = 'cursor'
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = CursorPaginator(queryset, self.cursor_ordering, page_size)
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except ValueError:
+            raise Http404("Invalid cursor")
+        return paginator, page, page.object_list, page.has_other_pages()
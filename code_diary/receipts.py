@@ -0,0 +1,145 @@
+import atexit
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connections
+from django.dispatch import receiver
+
+from .routers import routing_state
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_FLUSH_INTERVAL = 5
+
+
+class ReadReceiptBuffer:
+    """Process-local queue of read receipts, written to the database in batches.
+
+    Viewing an entry only queues its receipt. The queue is flushed once `batch_size` receipts are
+    pending, `flush_interval` seconds after the first of them was queued, and when the process exits.
+    Until a receipt is written, pending() lets the process treat the entry as read.
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = defaultdict(set)
+        self._flushing = {}
+        self._size = 0
+        self._timer = None
+
+    def add(self, user_id, entry_id):
+        """Queue the receipt of a user reading an entry."""
+        with self._lock:
+            entry_ids = self._pending[user_id]
+            if entry_id not in entry_ids:
+                entry_ids.add(entry_id)
+                self._size += 1
+            full = self._size >= self.batch_size
+            if not full:
+                self._start_timer()
+        if full:
+            self.flush()
+
+    def pending(self, user_id):
+        """Return the ids of the entries read by a user whose receipts are not written yet."""
+        with self._lock:
+            return self._pending.get(user_id, set()) | self._flushing.get(user_id, set())
+
+    def flush(self):
+        """Write the queued receipts in one batch and return how many there were.
+
+        If the write fails, the receipts are queued again and the error is raised.
+        """
+        with self._flush_lock:
+            with self._lock:
+                receipts, self._pending, self._size = dict(self._pending), defaultdict(set), 0
+                self._cancel_timer()
+                # Keep reporting the receipts as pending until they are committed
+                self._flushing = receipts
+            try:
+                # Routed on its own, not like the request whose receipt filled the batch
+                with routing_state():
+                    if receipts:
+                        from .models import ReadMarker
+                        ReadMarker.record_receipts(receipts)
+            except Exception:
+                # Queue the receipts again, so a later flush retries them instead of losing them
+                with self._lock:
+                    for user_id, entry_ids in receipts.items():
+                        pending = self._pending[user_id]
+                        self._size += len(entry_ids - pending)
+                        pending |= entry_ids
+                    self._start_timer()
+                raise
+            finally:
+                with self._lock:
+                    self._flushing = {}
+        return sum(map(len, receipts.values()))
+
+    def discard(self):
+        """Drop the queued receipts without writing them."""
+        with self._lock:
+            self._pending, self._size = defaultdict(set), 0
+            self._cancel_timer()
+
+    def _start_timer(self):
+        if self._timer is None and self.flush_interval:
+            self._timer = threading.Timer(self.flush_interval, self._flush_on_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _flush_on_timer(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Could not write the buffered read receipts")
+        finally:
+            # The timer thread opened its own connections
+            connections.close_all()
+
+
+_buffer = None
+
+
+def get_read_receipts():
+    """Return the read receipt buffer configured by the CODE_DIARY_READ_RECEIPT_* settings."""
+    global _buffer
+    if _buffer is None:
+        _buffer = ReadReceiptBuffer(
+            batch_size=getattr(settings, 'CODE_DIARY_READ_RECEIPT_BATCH_SIZE', DEFAULT_BATCH_SIZE),
+            flush_interval=getattr(settings, 'CODE_DIARY_READ_RECEIPT_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL),
+        )
+    return _buffer
+
+
+@atexit.register
+def flush_read_receipts():
+    """Write the receipts still queued when the process shuts down."""
+    if _buffer is not None:
+        try:
+            _buffer.flush()
+        except Exception:
+            logger.exception("Could not write the buffered read receipts")
+
+
+@receiver(setting_changed)
+def reset_read_receipts(setting, **kwargs):
+    """Drop the buffer when its settings are overridden, e.g. in tests."""
+    global _buffer
+    if setting.startswith('CODE_DIARY_READ_RECEIPT_') and _buffer is not None:
+        _buffer.discard()
+        _buffer = None
@@ -0,0 +1,132 @@
+import re
+
+from django.utils.html import escape
+from django.utils.text import Truncator
+from pygments import highlight as pygments_highlight
+from pygments.formatters import HtmlFormatter
+from pygments.lexers import get_lexer_by_name
+from pygments.util import ClassNotFound
+
+# Words and characters of content kept in the excerpt shown on entry cards
+EXCERPT_WORDS = 30
+EXCERPT_MAX_LENGTH = 300
+# Entry pages already use h1 for the title, so Markdown headings start lower
+HEADING_OFFSET = 2
+
+FENCE_RE = re.compile(r'^(```|~~~)\s*([\w+#.-]*)\s*$')
+HEADING_RE = re.compile(r'^(#{1,6})\s+(.*?)(?:\s+#+)?\s*$')
+LIST_ITEM_RE = re.compile(r'^\s*(?:[-*+]|(\d+)[.)])\s+(.*)$')
+CODE_SPAN_RE = re.compile(r'`([^`\n]+)`')
+LINK_RE = re.compile(r'\[([^\]\n]+)\]\((https?://[^\s)]+)\)')
+STRONG_RE = re.compile(r'\*\*(?=\S)(.+?)(?<=\S)\*\*')
+EMPHASIS_RE = re.compile(r'(?<![*\w])\*(?=[^\s*])(.+?)(?<=[^\s*])\*(?![*\w])')
+
+
+def render_code_block(code, language=''):
+    """Render a fenced code block, highlighted with Pygments when the language is known."""
+    if language:
+        try:
+            lexer = get_lexer_by_name(language)
+        except ClassNotFound:
+            lexer = None
+        if lexer is not None:
+            # Inline styles keep the stored HTML self-contained, without a stylesheet to ship
+            return pygments_highlight(code, lexer, HtmlFormatter(noclasses=True)).strip()
+    language_class = f' class="language-{escape(language)}"' if language else ''
+    return f'<pre><code{language_class}>{escape(code)}</code></pre>'
+
+
+def render_inline(text):
+    """Escape a line of text and render its code spans, links, bold and italic text."""
+    parts = CODE_SPAN_RE.split(text)
+    html = []
+    for index, part in enumerate(parts):
+        if index % 2:
+            html.append(f'<code>{escape(part)}</code>')
+            continue
+        part = escape(part)
+        part = LINK_RE.sub(r'<a href="\2" rel="nofollow">\1</a>', part)
+        part = STRONG_RE.sub(r'<strong>\1</strong>', part)
+        part = EMPHASIS_RE.sub(r'<em>\1</em>', part)
+        html.append(part)
+    return ''.join(html)
+
+
+def render_markdown(text):
+    """Render the Markdown subset used in diary entries to HTML.
+
+    Supports fenced code blocks, headings, bulleted and numbered lists, code spans, links, bold and
+    italic text. Everything else is escaped, so the result is safe to show as is. Paragraphs keep
+    their line breaks, like Django's linebreaks filter.
+    """
+    blocks = []
+    paragraph = []
+    items = []
+    list_tag = None
+
+    def close_blocks():
+        nonlocal list_tag
+        if paragraph:
+            blocks.append('<p>' + '<br>\n'.join(render_inline(line) for line in paragraph) + '</p>')
+            paragraph.clear()
+        if items:
+            blocks.append(f'<{list_tag}>' + ''.join(f'<li>{render_inline(item)}</li>' for item in items) + f'</{list_tag}>')
+            items.clear()
+            list_tag = None
+
+    lines = iter(text.replace('\r\n', '\n').split('\n'))
+    for line in lines:
+        fence = FENCE_RE.match(line.strip())
+        if fence:
+            close_blocks()
+            code = []
+            for code_line in lines:
+                if code_line.strip() == fence.group(1):
+                    break
+                code.append(code_line)
+            blocks.append(render_code_block('\n'.join(code) + '\n', fence.group(2)))
+            continue
+        if not line.strip():
+            close_blocks()
+            continue
+        heading = HEADING_RE.match(line)
+        if heading:
+            close_blocks()
+            level = min(len(heading.group(1)) + HEADING_OFFSET, 6)
+            blocks.append(f'<h{level}>{render_inline(heading.group(2))}</h{level}>')
+            continue
+        item = LIST_ITEM_RE.match(line)
+        if item:
+            tag = 'ol' if item.group(1) else 'ul'
+            if paragraph or list_tag != tag:
+                close_blocks()
+            list_tag = tag
+            items.append(item.group(2))
+            continue
+        if items:
+            close_blocks()
+        paragraph.append(line.strip())
+    close_blocks()
+    return '\n'.join(blocks)
+
+
+def make_excerpt(text):
+    """Return the first words of Markdown content as plain text, for entry cards."""
+    words = []
+    in_code = False
+    for line in text.splitlines():
+        if FENCE_RE.match(line.strip()):
+            in_code = not in_code
+            continue
+        if not in_code:
+            heading = HEADING_RE.match(line)
+            item = LIST_ITEM_RE.match(line)
+            line = heading.group(2) if heading else item.group(2) if item else line
+            line = CODE_SPAN_RE.sub(r'\1', line)
+            line = LINK_RE.sub(r'\1', line)
+            line = STRONG_RE.sub(r'\1', line)
+            line = EMPHASIS_RE.sub(r'\1', line)
+        words.extend(line.split())
+        if len(words) > EXCERPT_WORDS:
+            break
+    return Truncator(Truncator(' '.join(words)).words(EXCERPT_WORDS)).chars(EXCERPT_MAX_LENGTH)
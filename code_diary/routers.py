@@ -0,0 +1,139 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+DEFAULT_PIN_SECONDS = 10
+# Cookie keeping a client's reads on the primary for a while after it wrote, so it sees its own writes
+PIN_COOKIE_NAME = 'code_diary_primary'
+
+_routing = ContextVar('code_diary_routing', default=None)
+
+
+def get_replica_aliases():
+    """Return the aliases of the read replicas of the default database."""
+    return getattr(settings, 'CODE_DIARY_DATABASE_REPLICAS', ())
+
+
+def get_pin_seconds():
+    """Return the seconds a client reads from the primary after one of its requests wrote to it."""
+    return getattr(settings, 'CODE_DIARY_REPLICA_PIN_SECONDS', DEFAULT_PIN_SECONDS)
+
+
+class RoutingState:
+    """Where the reads of the current request go, and whether it has written."""
+
+    def __init__(self):
+        self.replica = None
+        self.wrote = False
+
+
+@contextmanager
+def routing_state():
+    """Track the database routing of a request or another unit of work, like a background flush."""
+    state = RoutingState()
+    token = _routing.set(state)
+    try:
+        yield state
+    finally:
+        _routing.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """Read from the primary inside the block, e.g. to compute a value cached until the next write."""
+    state = _routing.get()
+    previous = state.replica if state is not None else None
+    if state is not None:
+        state.replica = None
+    try:
+        yield
+    finally:
+        if state is not None and not state.wrote:
+            state.replica = previous
+
+
+def is_pinned_to_primary(request):
+    """Return whether a request must read from the primary: it may write, or its client wrote recently."""
+    return request.method not in ('GET', 'HEAD', 'OPTIONS') or PIN_COOKIE_NAME in request.COOKIES
+
+
+@contextmanager
+def _replica_routing(request):
+    """Send the reads inside the block to a replica, unless the request is pinned to the primary."""
+    state = _routing.get()
+    if state is None:
+        with routing_state(), _replica_routing(request):
+            yield
+        return
+    replicas = get_replica_aliases()
+    previous, state.replica = state.replica, None
+    if replicas and not state.wrote and not is_pinned_to_primary(request):
+        state.replica = random.choice(replicas)
+    try:
+        yield
+    finally:
+        state.replica = previous
+
+
+def replica_reads(view):
+    """View decorator sending the view's reads to a replica, unless the request is pinned to the primary.
+
+    Reads go back to the primary for the rest of the request as soon as it writes. The response is rendered
+    inside the decorator, since templates run the queries of lazy querysets. Async views are supported, the
+    routing follows their queries into the threads the async ORM runs them in.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            with _replica_routing(request):
+                return await view(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with _replica_routing(request):
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+        return response
+    return wrapper
+
+
+class ReplicaRouter:
+    """Database router sending the reads of views decorated with replica_reads to a replica.
+
+    Everything else, and all writes, goes to the default database. The replica aliases are listed in the
+    CODE_DIARY_DATABASE_REPLICAS setting; replicas are expected to be copies kept up to date outside Django,
+    so they are never migrated.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _routing.get()
+        if state is not None and state.replica is not None:
+            return state.replica
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None:
+            # Later reads of the request must see this write
+            state.wrote = True
+            state.replica = None
+        # Even for objects read from a replica
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *get_replica_aliases()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in get_replica_aliases():
+            return False
+        return None
@@ -0,0 +1,188 @@
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+from django.utils.text import Truncator
+
+from .models import DiaryEntry
+from .pagination import decode_cursor, encode_cursor, keyset_filter, parse_cursor_values
+
+SEARCH_TABLE = 'code_diary_diaryentry_fts'
+# bm25() weights of the indexed title, content and technologies columns
+SEARCH_WEIGHTS = (10.0, 1.0, 5.0)
+SNIPPET_WORDS = 24
+# Control characters FTS5 wraps around matches; they cannot appear in escaped HTML
+MATCH_START, MATCH_END = '\x02', '\x03'
+# Ordering of the LIKE fallback used on databases without FTS5
+FALLBACK_ORDERING = ('-date', '-id')
+# Triggers keeping the index created by migration 0009 in sync with every write to the entries.
+# SQLite drops them whenever a migration rebuilds the entries table, so they are recreated after migrate.
+SEARCH_TRIGGERS = {
+    'code_diary_diaryentry_fts_insert': f"""
+        CREATE TRIGGER IF NOT EXISTS code_diary_diaryentry_fts_insert AFTER INSERT ON code_diary_diaryentry BEGIN
+            INSERT INTO {SEARCH_TABLE}(rowid, title, content, technologies)
+            VALUES (new.id, new.title, new.content, new.technologies);
+        END
+    """,
+    'code_diary_diaryentry_fts_delete': f"""
+        CREATE TRIGGER IF NOT EXISTS code_diary_diaryentry_fts_delete AFTER DELETE ON code_diary_diaryentry BEGIN
+            INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, title, content, technologies)
+            VALUES ('delete', old.id, old.title, old.content, old.technologies);
+        END
+    """,
+    'code_diary_diaryentry_fts_update': f"""
+        CREATE TRIGGER IF NOT EXISTS code_diary_diaryentry_fts_update AFTER UPDATE OF title, content, technologies
+        ON code_diary_diaryentry BEGIN
+            INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, title, content, technologies)
+            VALUES ('delete', old.id, old.title, old.content, old.technologies);
+            INSERT INTO {SEARCH_TABLE}(rowid, title, content, technologies)
+            VALUES (new.id, new.title, new.content, new.technologies);
+        END
+    """,
+}
+
+
+def uses_search_index():
+    """Return True when the entries are indexed with SQLite FTS5 (see migration 0009)."""
+    return connection.vendor == 'sqlite'
+
+
+def ensure_search_index(using=DEFAULT_DB_ALIAS):
+    """Recreate the search index triggers if a table rebuild dropped them, and reindex the entries.
+
+    Returns True when the index had to be repaired.
+    """
+    db = connections[using]
+    if db.vendor != 'sqlite':
+        return False
+    with db.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name IN (%s, %s, %s, %s)",
+            [SEARCH_TABLE, *SEARCH_TRIGGERS],
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        if SEARCH_TABLE not in existing or existing.issuperset(SEARCH_TRIGGERS):
+            return False
+        for sql in SEARCH_TRIGGERS.values():
+            cursor.execute(sql)
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')")
+    return True
+
+
+def repair_search_index(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    """post_migrate receiver running ensure_search_index()."""
+    ensure_search_index(using)
+
+
+def get_search_terms(text):
+    """Split free text into the words searched for, ignoring FTS5 operators and punctuation."""
+    return re.findall(r'\w+', text or '')
+
+
+def build_match_query(text):
+    """Turn free text into an FTS5 query matching entries containing every word, also as a prefix."""
+    return ' '.join(f'"{term}"*' for term in get_search_terms(text))
+
+
+def highlight(text):
+    """Escape text returned by highlight()/snippet() and turn the match markers into <mark> tags."""
+    return mark_safe(escape(text).replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>'))
+
+
+def filter_by_search(queryset, text):
+    """Narrow a DiaryEntry queryset down to the entries matching every word of `text`."""
+    terms = get_search_terms(text)
+    if not terms:
+        return queryset.none()
+    if uses_search_index():
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s', [build_match_query(text)]
+        ))
+    for term in terms:
+        queryset = queryset.filter(
+            Q(title__icontains=term) | Q(content__icontains=term) | Q(technologies__icontains=term)
+        )
+    return queryset
+
+
+def search_entries(text, user=None, cursor=None, per_page=10):
+    """Return a page of entries matching `text`, best matches first, and the cursor of the next page.
+
+    Only entries of `user` are searched when given. Each entry gets `search_title` and
+    `search_snippet` attributes holding safe HTML with the matches wrapped in <mark>.
+    Raises ValueError for a malformed cursor.
+    """
+    after = decode_cursor(cursor) if cursor else None
+    if after is not None and len(after) != 2:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    if not get_search_terms(text):
+        return [], None
+    if not uses_search_index():
+        if after is not None:
+            after = parse_cursor_values(DiaryEntry, FALLBACK_ORDERING, after)
+        return _search_entries_fallback(text, user, after, per_page)
+    if after is not None:
+        # The rank and rowid of the last match of the previous page
+        if not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in after):
+            raise ValueError(f"Invalid cursor: {cursor!r}")
+        after = [float(after[0]), int(after[1])]
+
+    rank = f'bm25({SEARCH_TABLE}, {", ".join(map(str, SEARCH_WEIGHTS))})'
+    sql = (
+        f'SELECT {SEARCH_TABLE}.rowid, {rank}, highlight({SEARCH_TABLE}, 0, %s, %s), '
+        f"snippet({SEARCH_TABLE}, 1, %s, %s, '…', %s) FROM {SEARCH_TABLE}"
+    )
+    params = [MATCH_START, MATCH_END, MATCH_START, MATCH_END, SNIPPET_WORDS]
+    if user is not None:
+        sql += f' JOIN {DiaryEntry._meta.db_table} entry ON entry.id = {SEARCH_TABLE}.rowid'
+    sql += f' WHERE {SEARCH_TABLE} MATCH %s'
+    params.append(build_match_query(text))
+    if user is not None:
+        sql += ' AND entry.user_id = %s'
+        params.append(user.pk)
+    if after:
+        sql += f' AND ({rank} > %s OR ({rank} = %s AND {SEARCH_TABLE}.rowid > %s))'
+        params += [after[0], after[0], after[1]]
+    sql += ' ORDER BY 2, 1 LIMIT %s'
+    params.append(per_page + 1)
+
+    with connection.cursor() as db_cursor:
+        db_cursor.execute(sql, params)
+        rows = db_cursor.fetchall()  # (id, rank, title, snippet)
+
+    page = rows[:per_page]
+    entries_by_id = DiaryEntry.objects.select_related('user').prefetch_related('tags').defer(
+        'content', 'content_html'
+    ).order_by().in_bulk([row[0] for row in page])
+    entries = []
+    for entry_id, _, title, snippet in page:
+        if entry_id in entries_by_id:
+            entry = entries_by_id[entry_id]
+            entry.search_title = highlight(title)
+            entry.search_snippet = highlight(snippet)
+            entries.append(entry)
+
+    next_cursor = encode_cursor([page[-1][1], page[-1][0]]) if len(rows) > per_page else None
+    return entries, next_cursor
+
+
+def _search_entries_fallback(text, user, after, per_page):
+    """Unranked LIKE search, newest first, for databases without the FTS5 index."""
+    queryset = filter_by_search(
+        DiaryEntry.objects.select_related('user').prefetch_related('tags').defer('content', 'content_html'), text
+    )
+    if user is not None:
+        queryset = queryset.filter(user=user)
+    if after:
+        queryset = queryset.filter(keyset_filter(FALLBACK_ORDERING, after))
+    rows = list(queryset.order_by(*FALLBACK_ORDERING)[:per_page + 1])
+
+    entries = rows[:per_page]
+    for entry in entries:
+        entry.search_title = escape(entry.title)
+        entry.search_snippet = escape(Truncator(entry.excerpt).words(SNIPPET_WORDS))
+    next_cursor = encode_cursor([entries[-1].date, entries[-1].pk]) if len(rows) > per_page else None
+    return entries, next_cursor
@@ -0,0 +1,61 @@
+from django.utils.functional import cached_property
+
+from .models import UnreadEntry, UserProfile
+
+
+class SocialGraph:
+    """Follow graph of the current user, loaded lazily and shared by everything rendering a request.
+
+    Views, context processors and templates read the profile, followed ids and counters
+    from here, so a page costs at most one follow-graph query.
+    """
+
+    def __init__(self, request):
+        self.request = request
+
+    @property
+    def user(self):
+        return self.request.user
+
+    @cached_property
+    def profile(self):
+        """The current user's profile, or None for anonymous users."""
+        if not self.user.is_authenticated:
+            return None
+        return self.user.profile
+
+    async def aprofile(self):
+        """Async version of profile, for async views."""
+        if 'profile' not in self.__dict__:
+            user = await self.request.auser()
+            self.__dict__['profile'] = (
+                await UserProfile.objects.select_related('user').aget(user=user) if user.is_authenticated else None
+            )
+        return self.profile
+
+    @cached_property
+    def has_unread(self):
+        """Whether the current user has unread entries from followed users."""
+        return self.user.is_authenticated and UnreadEntry.has_unread(self.user)
+
+    @property
+    def following_ids(self):
+        """Set of the ids of the users the current user is following."""
+        # The profile caches the ids and drops them when following or unfollowing someone
+        return self.profile.following_ids if self.profile else frozenset()
+
+    @property
+    def following_count(self):
+        return self.profile.following_count if self.profile else 0
+
+    @property
+    def follower_count(self):
+        return self.profile.follower_count if self.profile else 0
+
+    @property
+    def entry_count(self):
+        return self.profile.entry_count if self.profile else 0
+
+    def is_following(self, user):
+        """Check if the current user is following a specific user."""
+        return user.pk in self.following_ids
@@ -0,0 +1,22 @@
+import importlib
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.test.utils import override_settings
+from django.urls import clear_url_caches
+
+
+@contextmanager
+def use_async_views(enabled):
+    """Route the endpoints that have async versions to the async or the sync views inside the block."""
+    def reload_urlconf():
+        importlib.reload(importlib.import_module('code_diary.urls'))
+        importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+        clear_url_caches()
+
+    try:
+        with override_settings(CODE_DIARY_ASYNC_VIEWS=enabled):
+            reload_urlconf()
+            yield
+    finally:
+        reload_urlconf()
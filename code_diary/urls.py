@@ -1,19 +1,34 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
 app_name = 'code_diary'
 
+# The endpoints with async versions use them when CODE_DIARY_ASYNC_VIEWS is on, as it is under core/asgi.py.
+# WSGI servers would run each async view in an event loop of its own, so they keep the sync versions.
+if getattr(settings, 'CODE_DIARY_ASYNC_VIEWS', False):
+    follow_user, unfollow_user = views.afollow_user, views.aunfollow_user
+    check_new_entries = views.acheck_new_entries
+else:
+    follow_user, unfollow_user = views.follow_user, views.unfollow_user
+    check_new_entries = views.check_new_entries
+
 urlpatterns = [
     # Home and entry list views
     path('', views.HomeView.as_view(), name='home'),
     path('my-entries/', views.MyDiaryEntryListView.as_view(), name='my_entries'),
     path('user/<str:username>/', views.UserDiaryEntryListView.as_view(), name='user_entries'),
+    path('feed/', views.FeedView.as_view(), name='feed'),
+    path('search/', views.SearchView.as_view(), name='search'),
+    path('technology/<str:key>/', views.TechnologyEntryListView.as_view(), name='technology_entries'),
+    path('stats/', views.TechnologyStatsView.as_view(), name='technology_stats'),
 
     # Entry CRUD views
     path('entry/<int:pk>/', views.DiaryEntryDetailView.as_view(), name='entry_detail'),
     path('entry/new/', views.DiaryEntryCreateView.as_view(), name='entry_create'),
     path('entry/<int:pk>/edit/', views.DiaryEntryUpdateView.as_view(), name='entry_update'),
     path('entry/<int:pk>/delete/', views.DiaryEntryDeleteView.as_view(), name='entry_delete'),
+    path('export/', views.export_entries, name='export_entries'),
 
     # Authentication views
     path('signup/', views.SignUpView.as_view(), name='signup'),
@@ -24,9 +39,17 @@ urlpatterns = [
     path('users/', views.UserListView.as_view(), name='user_list'),
     path('following/', views.FollowingListView.as_view(), name='following'),
     path('followers/', views.FollowersListView.as_view(), name='followers'),
-    path('follow/<str:username>/', views.follow_user, name='follow_user'),
-    path('unfollow/<str:username>/', views.unfollow_user, name='unfollow_user'),
+    path('follow/<str:username>/', follow_user, name='follow_user'),
+    path('unfollow/<str:username>/', unfollow_user, name='unfollow_user'),
+    path('mark-read/', views.mark_all_read, name='mark_all_read'),
+    path('mark-read/<str:username>/', views.mark_user_read, name='mark_user_read'),
 
     # AJAX views
-    path('check-new-entries/', views.check_new_entries, name='check_new_entries'),
+    path('check-new-entries/', check_new_entries, name='check_new_entries'),
+
+    # Monitoring
+    path('cache-stats/', views.cache_statistics, name='cache_stats'),
+
+    # Server-Sent Events (served natively under ASGI)
+    path('new-entries/stream/', views.new_entries_stream, name='new_entries_stream'),
 ]
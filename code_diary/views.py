@@ -1,17 +1,37 @@
-from django.shortcuts import render, get_object_or_404, redirect
+import asyncio
+import json
+import os
+
+from django.conf import settings
+from django.shortcuts import render, aget_object_or_404, get_object_or_404, redirect
+from django.template.loader import render_to_string
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, TemplateView
 from django.urls import reverse_lazy, reverse
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.auth.views import LoginView, LogoutView
 from django.contrib.auth.models import User
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
 from django.db.models import Q
-from django.http import JsonResponse, HttpResponseRedirect
-from .models import DiaryEntry, UserProfile
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, HttpResponseRedirect, Http404, StreamingHttpResponse
+from .models import DiaryEntry, ReadMarker, Technology, TechnologyUsage, UserProfile, UnreadEntry, annotate_user_stats
 from .forms import SignUpForm, LoginForm, DiaryEntryForm
+from .feed import get_feed_page
+from .search import search_entries
+from .export import EXPORT_FORMATS, iter_export
+from .pagination import CursorPaginationMixin
+from .conditional import ConditionalGetMixin
+from .caching import cache_stats, cached, get_entries_version, get_home_cache_timeout, get_user_cache_timeout, get_user_version, get_user_versions
+from .broker import get_broker, user_channel
+from .receipts import get_read_receipts
+from .routers import replica_reads
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.views.decorators.http import require_POST
 from django.contrib.auth import logout
 
 # Create your views here.
@@ -52,55 +72,69 @@ class CustomLogoutView(LogoutView):
         return super().dispatch(request, *args, **kwargs)
 
 # Diary Entry Views
-class HomeView(ListView):
+@method_decorator(replica_reads, name='dispatch')
+class HomeView(ConditionalGetMixin, ListView):
     """Home page showing the latest entries from all users."""
     model = DiaryEntry
     template_name = 'code_diary/home.html'
     context_object_name = 'entries'
-    paginate_by = 10
+
+    def get_page_state(self):
+        """The entries version changes whenever any entry does, and the user version with the sidebar stats.
+
+        Both are read from the cache.
+        """
+        values = (get_entries_version(),)
+        if self.request.user.is_authenticated:
+            values += (get_user_version(self.request.user.pk),)
+        return values, None
 
     def get_queryset(self):
         """Return the latest entries from all users."""
-        return DiaryEntry.objects.all().order_by('-date', '-created_at')[:10]
+        return DiaryEntry.objects.select_related('user').prefetch_related('tags').defer(
+            'content', 'content_html'
+        ).order_by('-date', '-created_at')[:10]
+
+    def get_entries_html(self):
+        """Render the latest entries once per entries version, shared by all visitors."""
+        def render_entries():
+            entries = list(self.object_list)
+            return render_to_string('code_diary/home_entries.html', {'entries': entries}) if entries else ''
+        return cached('home_entries', (get_entries_version(),), render_entries, get_home_cache_timeout())
+
+    def get_my_stats(self):
+        """Return the current user's counters for the sidebar, cached until their entries or follows change."""
+        user = self.request.user
+        return cached(
+            'home_stats', (user.pk, get_user_version(user.pk)),
+            lambda: UserProfile.objects.filter(user=user).values('entry_count', 'following_count', 'follower_count').first(),
+            get_user_cache_timeout(),
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['now'] = timezone.now()
+        context['entries_html'] = self.get_entries_html()
 
-        # Check for unread entries from followed users if logged in
+        # The notifications context processor checks for unread entries from followed users
         if self.request.user.is_authenticated:
-            following = self.request.user.profile.following.all()
-            if following.exists():
-                # Get entries from followed users created in the last day
-                from .models import ReadEntry
-                recent_entries = DiaryEntry.objects.filter(
-                    user__in=following,
-                    created_at__gt=timezone.now() - timezone.timedelta(days=1)
-                )
-
-                # Filter out entries that the user has already read
-                read_entry_ids = ReadEntry.objects.filter(
-                    user=self.request.user,
-                    entry__in=recent_entries
-                ).values_list('entry_id', flat=True)
-
-                unread_entries = recent_entries.exclude(id__in=read_entry_ids)
-
-                context['new_entries_from_following'] = unread_entries.exists()
+            context['my_stats'] = self.get_my_stats()
 
         return context
 
-class MyDiaryEntryListView(LoginRequiredMixin, ListView):
+@method_decorator(replica_reads, name='dispatch')
+class MyDiaryEntryListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     """View for listing the current user's diary entries."""
     model = DiaryEntry
     template_name = 'code_diary/entry_list.html'
     context_object_name = 'entries'
     paginate_by = 10
+    cursor_ordering = ('-date', '-id')
     login_url = reverse_lazy('code_diary:login')
 
     def get_queryset(self):
         """Return only the current user's entries."""
-        return DiaryEntry.objects.filter(user=self.request.user).order_by('-date')
+        return DiaryEntry.objects.filter(user=self.request.user).prefetch_related('tags').defer('content', 'content_html')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -108,47 +142,233 @@ class MyDiaryEntryListView(LoginRequiredMixin, ListView):
         context['is_my_entries'] = True
         return context
 
-class UserDiaryEntryListView(ListView):
+@method_decorator(replica_reads, name='dispatch')
+class UserDiaryEntryListView(ConditionalGetMixin, CursorPaginationMixin, ListView):
     """View for listing a specific user's diary entries (read-only for other users)."""
     model = DiaryEntry
     template_name = 'code_diary/user_entries.html'
     context_object_name = 'entries'
     paginate_by = 10
+    cursor_ordering = ('-date', '-id')
+
+    def get_diary_user(self):
+        if not hasattr(self, 'diary_user'):
+            self.diary_user = get_object_or_404(
+                User.objects.select_related('profile'), username=self.kwargs['username']
+            )
+        return self.diary_user
+
+    def get_page_state(self):
+        """Validate the page with the user's profile, their version and the cursor.
+
+        The version is read from the cache and changes whenever one of their entries is saved or
+        deleted. It is not a time, so the page has no Last-Modified.
+        """
+        diary_user = self.get_diary_user()
+        profile = diary_user.profile
+        values = (
+            diary_user.pk, diary_user.username, profile.entry_count, profile.following_count,
+            profile.follower_count, get_user_version(diary_user.pk), self.request.GET.get(self.cursor_kwarg),
+        )
+        if self.request.user.is_authenticated:
+            values += (self.request.social_graph.is_following(diary_user),)
+        return values, None
 
     def get_queryset(self):
         """Return only the specified user's entries."""
-        self.diary_user = get_object_or_404(User, username=self.kwargs['username'])
-        return DiaryEntry.objects.filter(user=self.diary_user).order_by('-date')
+        return DiaryEntry.objects.filter(user=self.get_diary_user()).prefetch_related('tags').defer('content', 'content_html')
+
+    def get_paginate_by(self, queryset):
+        # Pages are paginated by get_entries_html, and only when they are not cached
+        return None
+
+    def get_entries_html(self):
+        """Render a page of the user's entries once per user version, shared by all visitors."""
+        diary_user = self.get_diary_user()
+        cursor = self.request.GET.get(self.cursor_kwarg)
+
+        def render_entries():
+            _, page, entries, is_paginated = self.paginate_queryset(self.object_list, self.paginate_by)
+            return render_to_string('code_diary/user_entries_list.html', {
+                'diary_user': diary_user, 'entries': entries, 'page_obj': page, 'is_paginated': is_paginated,
+            })
+        return cached(
+            'user_entries', (diary_user.pk, get_user_version(diary_user.pk), cursor), render_entries,
+            get_user_cache_timeout(),
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['diary_user'] = self.diary_user
+        context['entries_html'] = self.get_entries_html()
 
         # Check if the current user is following this user
         if self.request.user.is_authenticated:
-            context['is_following'] = self.request.user.profile.is_following(self.diary_user)
+            context['is_following'] = self.request.social_graph.is_following(self.diary_user)
+
+        return context
+
+@method_decorator(replica_reads, name='dispatch')
+class TechnologyEntryListView(CursorPaginationMixin, ListView):
+    """View for listing all users' entries tagged with a technology."""
+    template_name = 'code_diary/technology_entries.html'
+    context_object_name = 'entries'
+    paginate_by = 10
+    cursor_ordering = ('-date', '-id')
+
+    def get_queryset(self):
+        """Return the entries tagged with the technology in the URL."""
+        self.technology = get_object_or_404(Technology, key=self.kwargs['key'].lower())
+        return self.technology.entries.select_related('user').prefetch_related('tags').defer('content', 'content_html')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['technology'] = self.technology
+        return context
+
+class TechnologyStatsView(LoginRequiredMixin, TemplateView):
+    """Dashboard of the technologies the current user used per week or month, read from the usage rollups."""
+    template_name = 'code_diary/technology_stats.html'
+    login_url = reverse_lazy('code_diary:login')
+    periods_shown = 12
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        period = self.request.GET.get('period')
+        if period not in dict(TechnologyUsage.PERIOD_CHOICES):
+            period = TechnologyUsage.MONTH
+        starts = TechnologyUsage.recent_period_starts(period, self.periods_shown)
+
+        usage = {}
+        for rollup in TechnologyUsage.objects.filter(
+            user=self.request.user, period=period, period_start__gte=starts[0]
+        ).select_related('technology'):
+            usage.setdefault(rollup.technology, {})[rollup.period_start] = rollup.entry_count
+        rows = sorted(
+            (
+                {
+                    'technology': technology,
+                    'counts': [counts.get(start, 0) for start in starts],
+                    'total': sum(counts.values()),
+                }
+                for technology, counts in usage.items()
+            ),
+            key=lambda row: (-row['total'], row['technology'].key)
+        )
+
+        context['period'] = period
+        context['period_choices'] = TechnologyUsage.PERIOD_CHOICES
+        context['period_starts'] = starts
+        context['rows'] = rows
+        return context
+
+@method_decorator(replica_reads, name='dispatch')
+class FeedView(LoginRequiredMixin, ListView):
+    """View for the feed of entries from users the current user follows."""
+    template_name = 'code_diary/feed.html'
+    context_object_name = 'entries'
+    paginate_by = 10
+    login_url = reverse_lazy('code_diary:login')
+
+    def get_queryset(self):
+        """Return a page of entries read from the current user's inbox."""
+        try:
+            entries, self.next_cursor = get_feed_page(
+                self.request.user, self.request.GET.get('cursor'), self.paginate_by
+            )
+        except ValueError:
+            raise Http404("Invalid cursor")
+        return entries
+
+    def paginate_queryset(self, queryset, page_size):
+        """The feed is paginated by cursor in get_queryset, so just pass the page through."""
+        return None, None, queryset, self.next_cursor is not None
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['next_cursor'] = self.next_cursor
+        return context
+
+@method_decorator(replica_reads, name='dispatch')
+class SearchView(ListView):
+    """Full-text search over diary entries, best matches first.
+
+    The `scope` parameter searches all entries, the current user's (`mine`) or one user's (`user`, with `username`).
+    """
+    template_name = 'code_diary/search.html'
+    context_object_name = 'entries'
+    paginate_by = 10
+    scopes = ('all', 'mine', 'user')
+
+    def get_search_user(self):
+        """Return the user whose entries are searched, or None to search all entries."""
+        if self.scope == 'mine':
+            return self.request.user
+        if self.scope == 'user':
+            return get_object_or_404(User, username=self.request.GET.get('username', ''))
+        return None
 
+    def get_queryset(self):
+        """Return a page of entries matching the search query."""
+        self.query = self.request.GET.get('q', '').strip()
+        self.scope = self.request.GET.get('scope', 'all')
+        if self.scope not in self.scopes or (self.scope == 'mine' and not self.request.user.is_authenticated):
+            self.scope = 'all'
+        self.search_user = self.get_search_user()
+        try:
+            entries, self.next_cursor = search_entries(
+                self.query, self.search_user, self.request.GET.get('cursor'), self.paginate_by
+            )
+        except ValueError:
+            raise Http404("Invalid cursor")
+        return entries
+
+    def paginate_queryset(self, queryset, page_size):
+        """Search results are paginated by cursor in get_queryset, so just pass the page through."""
+        return None, None, queryset, self.next_cursor is not None
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.query
+        context['scope'] = self.scope
+        context['search_user'] = self.search_user
+        context['next_cursor'] = self.next_cursor
         return context
 
-class DiaryEntryDetailView(DetailView):
+
+@method_decorator(replica_reads, name='dispatch')
+class DiaryEntryDetailView(ConditionalGetMixin, DetailView):
     """View for displaying a single diary entry."""
     model = DiaryEntry
     template_name = 'code_diary/entry_detail.html'
     context_object_name = 'entry'
+    queryset = DiaryEntry.objects.prefetch_related('tags')
+
+    def get_page_state(self):
+        """Validate the page with the entry's last update, which also covers its tags."""
+        entry = DiaryEntry.objects.filter(pk=self.kwargs['pk']).values_list('updated_at', 'user_id').first()
+        if entry is None:
+            return None
+        updated_at, author_id = entry
+        values = (self.kwargs['pk'], updated_at)
+        if self.request.user.is_authenticated:
+            # Following the author changes whether viewing the entry records a read receipt
+            values += (author_id in self.request.social_graph.following_ids,)
+        return values, updated_at
 
     def get(self, request, *args, **kwargs):
         """Mark the entry as read if the user is authenticated and the entry is from someone they follow."""
         response = super().get(request, *args, **kwargs)
 
-        # Only mark as read if the user is authenticated
-        if request.user.is_authenticated:
-            entry = self.get_object()
+        # Only mark as read if the user is authenticated and the page was rendered; a 304 Not Modified
+        # answers a page seen before, when the read receipt was already queued
+        if request.user.is_authenticated and response.status_code == 200:
+            entry = self.object
 
             # Only mark as read if the entry is from someone the user follows
-            if entry.user != request.user and request.user.profile.is_following(entry.user):
-                # Create a ReadEntry record if it doesn't exist
-                from .models import ReadEntry
-                ReadEntry.objects.get_or_create(user=request.user, entry=entry)
+            if entry.user != request.user and request.social_graph.is_following(entry.user):
+                # Queue the read receipt; it is written with the next batch
+                get_read_receipts().add(request.user.pk, entry.pk)
 
         return response
 
@@ -231,47 +451,79 @@ class DiaryEntryDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
 
 
 # User Profile and Following Views
-class UserListView(ListView):
+@method_decorator(replica_reads, name='dispatch')
+class UserListView(CursorPaginationMixin, ListView):
     """View for listing all users."""
     model = User
     template_name = 'code_diary/user_list.html'
     context_object_name = 'users'
     paginate_by = 20
+    cursor_ordering = ('username', 'id')
 
     def get_queryset(self):
         """Return all active users except the current user."""
-        return User.objects.filter(is_active=True).exclude(id=self.request.user.id if self.request.user.is_authenticated else 0)
+        return annotate_user_stats(
+            User.objects.filter(is_active=True).exclude(id=self.request.user.id if self.request.user.is_authenticated else 0)
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         if self.request.user.is_authenticated:
-            following_ids = self.request.user.profile.following.values_list('id', flat=True)
-            context['following_ids'] = following_ids
+            context['following_ids'] = self.request.social_graph.following_ids
         return context
 
-class FollowingListView(LoginRequiredMixin, ListView):
+@method_decorator(replica_reads, name='dispatch')
+class FollowingListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     """View for listing users that the current user is following."""
     model = User
     template_name = 'code_diary/following_list.html'
     context_object_name = 'following'
     paginate_by = 20
+    cursor_ordering = ('username', 'id')
     login_url = reverse_lazy('code_diary:login')
 
     def get_queryset(self):
         """Return users that the current user is following."""
-        return self.request.user.profile.following.all()
-
-class FollowersListView(LoginRequiredMixin, ListView):
+        return annotate_user_stats(self.request.social_graph.profile.following.all(), latest_entry=True)
+
+    def paginate_queryset(self, queryset, page_size):
+        """Return a page of followed users, cached until the current user or one of the users on it changes.
+
+        Which users are on the page is cached under the current user's version, which follows and unfollows
+        bump, and the page itself under the versions of the users on it, so the counters and latest entries
+        it shows are never stale. Only the versions of one page of users are read, however many are followed.
+        """
+        user_id = self.request.user.pk
+        cursor = self.request.GET.get(self.cursor_kwarg)
+        timeout = get_user_cache_timeout()
+
+        def get_page_ids():
+            following = self.request.social_graph.profile.following.only('username')
+            _, page, users, _ = super(FollowingListView, self).paginate_queryset(following, page_size)
+            return [user.pk for user in users]
+        page_ids = cached('following_ids', (user_id, get_user_version(user_id), cursor, page_size), get_page_ids, timeout)
+        versions = get_user_versions([user_id, *page_ids])
+        key = (user_id, cursor, page_size, sorted(versions.items()))
+
+        def get_page():
+            _, page, users, is_paginated = super(FollowingListView, self).paginate_queryset(queryset, page_size)
+            return page, is_paginated
+        page, is_paginated = cached('following', key, get_page, timeout)
+        return None, page, page.object_list, is_paginated
+
+@method_decorator(replica_reads, name='dispatch')
+class FollowersListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     """View for listing users that follow the current user."""
     model = User
     template_name = 'code_diary/followers_list.html'
     context_object_name = 'followers'
     paginate_by = 20
+    cursor_ordering = ('username', 'id')
     login_url = reverse_lazy('code_diary:login')
 
     def get_queryset(self):
         """Return users that follow the current user."""
-        return self.request.user.profile.get_followers()
+        return annotate_user_stats(self.request.social_graph.profile.get_followers())
 
 @login_required
 def follow_user(request, username):
@@ -279,7 +531,7 @@ def follow_user(request, username):
     user_to_follow = get_object_or_404(User, username=username)
 
     # Try to follow the user
-    if request.user.profile.follow(user_to_follow):
+    if request.social_graph.profile.follow(user_to_follow):
         messages.success(request, f"You are now following {username}")
     else:
         messages.info(request, f"You are already following {username}")
@@ -293,7 +545,7 @@ def unfollow_user(request, username):
     user_to_unfollow = get_object_or_404(User, username=username)
 
     # Try to unfollow the user
-    if request.user.profile.unfollow(user_to_unfollow):
+    if request.social_graph.profile.unfollow(user_to_unfollow):
         messages.success(request, f"You have unfollowed {username}")
     else:
         messages.info(request, f"You were not following {username}")
@@ -302,28 +554,140 @@ def unfollow_user(request, username):
     return redirect('code_diary:user_entries', username=username)
 
 @login_required
+async def afollow_user(request, username):
+    """Async version of follow_user, served without a thread per request under ASGI."""
+    user_to_follow = await aget_object_or_404(User, username=username)
+
+    profile = await request.social_graph.aprofile()
+    if await profile.afollow(user_to_follow):
+        messages.success(request, f"You are now following {username}")
+    else:
+        messages.info(request, f"You are already following {username}")
+
+    return redirect('code_diary:user_entries', username=username)
+
+@login_required
+async def aunfollow_user(request, username):
+    """Async version of unfollow_user, served without a thread per request under ASGI."""
+    user_to_unfollow = await aget_object_or_404(User, username=username)
+
+    profile = await request.social_graph.aprofile()
+    if await profile.aunfollow(user_to_unfollow):
+        messages.success(request, f"You have unfollowed {username}")
+    else:
+        messages.info(request, f"You were not following {username}")
+
+    return redirect('code_diary:user_entries', username=username)
+
+def mark_read_response(request, marked):
+    """Answer a mark-as-read request with JSON for AJAX calls, otherwise redirect back with a message."""
+    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+        return JsonResponse({'marked': marked, 'new_entries': UnreadEntry.has_unread(request.user)})
+    messages.success(request, f"Marked the entries of {marked} user{'' if marked == 1 else 's'} as read.")
+    next_url = request.POST.get('next')
+    if not url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+        next_url = reverse('code_diary:feed')
+    return redirect(next_url)
+
+@login_required
+@require_POST
+def mark_all_read(request):
+    """Mark all entries of the users the current user follows as read."""
+    following = request.social_graph.profile.get_following()
+    return mark_read_response(request, ReadMarker.mark_read(request.user, following))
+
+@login_required
+@require_POST
+def mark_user_read(request, username):
+    """Mark all entries of one user as read."""
+    author = get_object_or_404(User, username=username)
+    return mark_read_response(request, ReadMarker.mark_read(request.user, [author]))
+
+@login_required
+def export_entries(request):
+    """Stream a download of the current user's whole diary as JSONL, CSV or Markdown.
+
+    Pass `since` (YYYY-MM-DD) to resume an interrupted download from the date of the last entry received.
+    """
+    export_format = request.GET.get('format', 'jsonl')
+    if export_format not in EXPORT_FORMATS:
+        raise Http404("Unknown export format")
+    since = None
+    if request.GET.get('since'):
+        try:
+            since = parse_date(request.GET['since'])
+        except ValueError:
+            since = None
+        if since is None:
+            raise Http404("Invalid since date")
+
+    content_type, extension = EXPORT_FORMATS[export_format]
+    response = StreamingHttpResponse(
+        iter_export(request.user, export_format, since), content_type=f'{content_type}; charset=utf-8'
+    )
+    filename = f'code-diary-{request.user.username}-{timezone.localdate():%Y-%m-%d}.{extension}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+@login_required
+@replica_reads
 def check_new_entries(request):
     """AJAX view to check for unread entries from followed users."""
     if request.headers.get('x-requested-with') == 'XMLHttpRequest':
-        following = request.user.profile.following.all()
-        if following.exists():
-            # Get entries from followed users created in the last day
-            from .models import ReadEntry
-            recent_entries = DiaryEntry.objects.filter(
-                user__in=following,
-                created_at__gt=timezone.now() - timezone.timedelta(days=1)
-            )
-
-            # Filter out entries that the user has already read
-            read_entry_ids = ReadEntry.objects.filter(
-                user=request.user,
-                entry__in=recent_entries
-            ).values_list('entry_id', flat=True)
+        return JsonResponse({'new_entries': UnreadEntry.has_unread(request.user)})
 
-            unread_entries = recent_entries.exclude(id__in=read_entry_ids)
+    return JsonResponse({'error': 'Invalid request'}, status=400)
 
-            return JsonResponse({'new_entries': unread_entries.exists()})
-        else:
-            return JsonResponse({'new_entries': False})
+@login_required
+@replica_reads
+async def acheck_new_entries(request):
+    """Async version of check_new_entries, served without a thread per request under ASGI."""
+    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+        user = await request.auser()
+        return JsonResponse({'new_entries': await UnreadEntry.ahas_unread(user)})
 
     return JsonResponse({'error': 'Invalid request'}, status=400)
+
+@staff_member_required
+def cache_statistics(request):
+    """JSON hit and miss counters of the cached pages and fragments, for monitoring.
+
+    The counters are kept per process, so each worker reports its own.
+    """
+    return JsonResponse({
+        'pid': os.getpid(),
+        'backend': settings.CACHES['default']['BACKEND'],
+        'caches': cache_stats.snapshot(),
+    })
+
+
+# Seconds between keep-alive comments on idle event streams
+EVENT_STREAM_KEEPALIVE = 15
+
+@login_required
+async def new_entries_stream(request):
+    """Server-Sent Events stream pushing notifications about new entries from followed users."""
+    if not isinstance(request, ASGIRequest):
+        # WSGI would buffer the endless stream, clients should poll check_new_entries instead
+        return JsonResponse({'error': 'Event streams are only served under ASGI'}, status=501)
+
+    user = await request.auser()
+
+    async def events():
+        with get_broker().subscribe(user_channel(user.pk)) as subscription:
+            # Send the current state first so clients don't need to poll on connect
+            has_unread = await UnreadEntry.ahas_unread(user)
+            yield f"data: {json.dumps({'new_entries': has_unread})}\n\n"
+
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscription.get(), EVENT_STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"data: {json.dumps(message)}\n\n"
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
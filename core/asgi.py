@@ -3,6 +3,15 @@ ASGI config for core project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve the project through it (e.g. ``uvicorn core.asgi:application``) to get the
+Server-Sent Events notification stream; under WSGI clients fall back to polling.
+It also switches the follow and new entries endpoints to their async views
+(CODE_DIARY_ASYNC_VIEWS), which are served without a thread per request.
+
+Django runs the queries of each ASGI request in a thread of its own, so a persistent
+connection would never be reused, only left open; DATABASE_CONN_MAX_AGE defaults to 0
+here. Use DATABASE_POOL=true with PostgreSQL to reuse connections.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -12,5 +21,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+os.environ.setdefault("CODE_DIARY_ASYNC_VIEWS", "true")
+os.environ.setdefault("DATABASE_CONN_MAX_AGE", "0")
 
 application = get_asgi_application()
\ No newline at end of file
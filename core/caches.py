@@ -0,0 +1,51 @@
+"""
+Cache settings read from the environment.
+
+CACHE_URL selects the cache backend:
+
+- locmem:// (default) keeps the cache in each process, so writes only invalidate the cache of the
+  process handling them; use it with a single process.
+- file:///var/tmp/code-diary-cache stores it in a directory shared by the processes of one host.
+- redis://localhost:6379/0 (or rediss:// for TLS) uses a Redis-compatible server, such as Redis, Valkey
+  or KeyDB, shared by all processes and hosts; it needs the redis package.
+- dummy:// caches nothing.
+
+For locmem and file caches, query string parameters such as ?max_entries=10000 become backend OPTIONS.
+"""
+
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from django.core.exceptions import ImproperlyConfigured
+
+BACKENDS = {
+    "locmem": "django.core.cache.backends.locmem.LocMemCache",
+    "file": "django.core.cache.backends.filebased.FileBasedCache",
+    "redis": "django.core.cache.backends.redis.RedisCache",
+    "rediss": "django.core.cache.backends.redis.RedisCache",
+    "dummy": "django.core.cache.backends.dummy.DummyCache",
+}
+
+
+def get_cache_settings(url):
+    """Turn a cache URL into a CACHES entry."""
+    parts = urlsplit(url)
+    backend = BACKENDS.get(parts.scheme)
+    if backend is None:
+        raise ImproperlyConfigured(
+            f"Unsupported cache URL scheme {parts.scheme!r}, use one of {', '.join(sorted(BACKENDS))}"
+        )
+    config = {"BACKEND": backend}
+    if parts.scheme in ("redis", "rediss"):
+        # The redis client reads the host, database and credentials from the URL itself
+        config["LOCATION"] = url
+        return config
+    if parts.scheme == "file":
+        if not parts.path:
+            raise ImproperlyConfigured("File cache URLs need a directory, e.g. file:///var/tmp/code-diary-cache")
+        config["LOCATION"] = unquote(parts.path)
+    elif parts.scheme == "locmem":
+        config["LOCATION"] = parts.netloc
+    options = {name.upper(): int(value) for name, value in parse_qsl(parts.query)}
+    if options:
+        config["OPTIONS"] = options
+    return config
@@ -10,8 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from .caches import get_cache_settings
+from .databases import get_database_settings, parse_bool
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -41,11 +45,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "code_diary.middleware.QueryInstrumentationMiddleware",
+    "code_diary.middleware.DatabaseRoutingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "code_diary.middleware.SocialGraphMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -64,6 +71,7 @@ TEMPLATES = [
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
                 "code_diary.context_processors.notifications",
+                "code_diary.context_processors.social_graph",
             ],
         },
     },
@@ -80,11 +88,29 @@ WSGI_APPLICATION = "core.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# The database comes from DATABASE_URL, see core/databases.py for the connection and pooling variables
 DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+    "default": get_database_settings(os.environ, os.environ.get("DATABASE_URL", f"sqlite:///{BASE_DIR / 'db.sqlite3'}")),
+}
+
+# Read replicas: comma separated database URLs of copies kept up to date outside Django, e.g. by
+# streaming replication, Litestream or LiteFS. They become the replica1, replica2... aliases.
+for number, url in enumerate(filter(None, os.environ.get("DATABASE_REPLICA_URLS", "").split(",")), start=1):
+    DATABASES[f"replica{number}"] = {
+        **get_database_settings(os.environ, url.strip()),
+        # Test runs read the test copy of the default database through them
+        "TEST": {"MIRROR": "default"},
     }
+
+DATABASE_ROUTERS = ["code_diary.routers.ReplicaRouter"]
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# The backend comes from CACHE_URL, see core/caches.py; use a shared one when running several processes
+CACHES = {
+    "default": get_cache_settings(os.environ.get("CACHE_URL", "locmem://")),
 }
 
 
@@ -128,3 +154,48 @@ STATIC_URL = "static/"
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+
+# Code Diary settings
+
+# Authors with more followers than this are fanned out on read instead of on write
+CODE_DIARY_FEED_FANOUT_LIMIT = 1000
+
+# Pub/sub backend pushing new entry notifications to Server-Sent Events streams
+CODE_DIARY_NOTIFICATION_BROKER = "code_diary.broker.InProcessBroker"
+
+# Serve the follow and new entries endpoints with their async views; core/asgi.py turns this on
+CODE_DIARY_ASYNC_VIEWS = parse_bool(os.environ.get("CODE_DIARY_ASYNC_VIEWS", "false"))
+
+# Seconds a rendered home page entry list is cached; entry changes invalidate it sooner
+CODE_DIARY_HOME_CACHE_TIMEOUT = 3600
+
+# Seconds the pages and fragments of a user are cached; changes to their entries or follows invalidate them sooner
+CODE_DIARY_USER_CACHE_TIMEOUT = 3600
+
+# Maximum number of SQL queries per URL name, enforced by the test suite and logged when exceeded
+CODE_DIARY_QUERY_BUDGETS_FILE = BASE_DIR / "code_diary" / "query_budgets.json"
+
+# Read receipts are buffered per process and written once this many are queued...
+CODE_DIARY_READ_RECEIPT_BATCH_SIZE = 100
+# ...or this many seconds after the first one was queued, and when the process exits
+CODE_DIARY_READ_RECEIPT_FLUSH_INTERVAL = 5
+
+# Seconds browsers and shared caches may reuse anonymous entry pages before revalidating them with their ETag
+CODE_DIARY_PUBLIC_CACHE_MAX_AGE = 0
+
+
+# SQLite pragmas applied to every new connection; each can be overridden per environment with the
+# CODE_DIARY_SQLITE_<PRAGMA> environment variable, e.g. CODE_DIARY_SQLITE_BUSY_TIMEOUT=10000
+CODE_DIARY_SQLITE_PRAGMAS = {
+    "journal_mode": os.environ.get("CODE_DIARY_SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.environ.get("CODE_DIARY_SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.environ.get("CODE_DIARY_SQLITE_BUSY_TIMEOUT", 5000)),
+    "mmap_size": int(os.environ.get("CODE_DIARY_SQLITE_MMAP_SIZE", 128 * 1024 * 1024)),
+    "cache_size": int(os.environ.get("CODE_DIARY_SQLITE_CACHE_SIZE", -20000)),
+}
+
+# Database aliases the read-only list and entry views read from, chosen at random per request
+CODE_DIARY_DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+# Seconds a client keeps reading from the default database after writing to it, to see its own writes
+CODE_DIARY_REPLICA_PIN_SECONDS = 10